@@ -0,0 +1,3 @@
+"""
+Benchmarks do FlowTube.
+"""
@@ -0,0 +1,425 @@
+"""
+Servidor local que imita a API de Dados do YouTube para os benchmarks do FlowTube.
+Responde a search.list, channels.list, playlistItems.list, videos.list, aos feeds RSS
+dos canais e às miniaturas com dados sintéticos e determinísticos, com latência
+configurável, respostas parciais (fields=) e gzip, e conta as requisições e os bytes enviados.
+Falhas (429, 403 quotaExceeded, 5xx) podem ser injetadas nas próximas chamadas com fail_next(). O cliente é apontado para ele com
+YOUTUBE_API_ENDPOINT, e o backend RSS com YOUTUBE_FEED_URL=<url>feeds/videos.xml.
+Feeds gravados (<channel_id>.xml em um diretório, --feeds-dir) substituem os sintéticos.
+Há um feed gravado em benchmarks/feeds/, verificado por python -m benchmarks.rss_check.
+
+Uso isolado:
+    python -m benchmarks.fake_youtube [--port 8765] [--latency 0.05]
+"""
+
+import io
+import os
+import gzip
+import json
+import time
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import escape, quoteattr
+
+# Horário de referência do vídeo mais recente de cada canal
+BASE_TIME = datetime(2024, 6, 1, tzinfo=timezone.utc).timestamp()
+
+# Número de uploads sintéticos de cada canal
+UPLOADS_PER_CHANNEL = 200
+
+# Número de vídeos em cada feed RSS (como no YouTube)
+FEED_ENTRIES = 15
+
+# Palavras usadas nos títulos sintéticos (algumas coincidem com as palavras-chave dos benchmarks)
+VOCABULARY = [
+    "python", "rust", "ai", "music", "review", "tutorial", "live", "news", "gaming", "cooking",
+    "travel", "science", "history", "podcast", "vlog", "design", "linux", "javascript", "data", "space"
+]
+
+def parse_fields(text, start=0):
+    """
+    Interpreta uma máscara de resposta parcial (ex.: "etag,items(id,snippet/title)").
+
+    Returns:
+        tuple: (árvore campo -> subárvore, com None para o campo inteiro; posição final)
+    """
+    tree = {}
+    position = start
+    while position < len(text) and text[position] != ')':
+        path = []
+        while True:
+            end = position
+            while end < len(text) and text[end] not in ',/()':
+                end += 1
+            path.append(text[position:end].strip())
+            position = end
+            if position < len(text) and text[position] == '/':
+                position += 1
+                continue
+            break
+        subtree = None
+        if position < len(text) and text[position] == '(':
+            subtree, position = parse_fields(text, position + 1)
+            position += 1
+        node = tree
+        for name in path[:-1]:
+            # Um campo já pedido inteiro continua inteiro
+            node = node.setdefault(name, {}) if node.get(name, {}) is not None else {}
+        if path[-1] not in node or subtree is None:
+            node[path[-1]] = subtree
+        elif node[path[-1]] is not None:
+            node[path[-1]].update(subtree)
+        if position < len(text) and text[position] == ',':
+            position += 1
+    return tree, position
+
+def apply_fields(value, tree):
+    """Mantém apenas os campos da máscara (aplicada a cada elemento das listas)."""
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [apply_fields(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {name: apply_fields(value[name], subtree) for name, subtree in tree.items() if name in value}
+    return value
+
+def make_thumbnail():
+    """Gera uma miniatura JPEG sintética de 480x360 (tamanho típico de um hqdefault.jpg)."""
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.effect_noise((480, 360), 32).convert('RGB').save(buffer, 'JPEG', quality=70)
+    return buffer.getvalue()
+
+def channel_number(channel_id):
+    """Extrai o número de um ID sintético (UCfake...00042 ou UUfake...00042 -> 42)."""
+    return int(channel_id[-5:])
+
+def fake_channel_id(number):
+    """Retorna o ID sintético do canal de número dado."""
+    # 24 caracteres, como os IDs reais
+    return f"UCfake{number:018d}"
+
+def upload_interval(number):
+    """Intervalo (segundos) entre uploads do canal: de 1 hora a 30 dias, variando por canal."""
+    return 3600 * (1 + int(hashlib.md5(str(number).encode()).hexdigest(), 16) % 720)
+
+def iso(timestamp):
+    """Formata um timestamp como publishedAt."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+class FakeYouTube:
+    """Servidor HTTP local com a API sintética, executado em uma thread."""
+
+    def __init__(self, latency=0.0, thumbnail_latency=0.0, uploads_per_channel=UPLOADS_PER_CHANNEL, feeds_dir=None):
+        self.latency = latency
+        self.thumbnail_latency = thumbnail_latency
+        self.uploads_per_channel = uploads_per_channel
+        self.feeds_dir = feeds_dir
+        self.thumbnail = make_thumbnail()
+        self.requests = Counter()
+        self.bytes_sent = 0
+        self._faults = []
+        self._lock = threading.Lock()
+        self._server = None
+        self.url = None
+
+    # Dados sintéticos
+
+    def video(self, number, index):
+        """Retorna (video_id, publishedAt, título, descrição) do upload index (0 = mais recente) do canal."""
+        words = [VOCABULARY[(number * 7 + index * 3 + k) % len(VOCABULARY)] for k in range(3)]
+        return (
+            f"v{number:05d}{index:05d}",
+            iso(BASE_TIME - index * upload_interval(number) - number),
+            f"{' '.join(words).title()} #{index}",
+            f"Synthetic upload {index} of channel {number} about {words[0]}"
+        )
+
+    def thumbnails(self, video_id):
+        """Todos os tamanhos de miniatura, como nas respostas completas da API."""
+        return {
+            key: {'url': f"{self.url}vi/{video_id}/{name}.jpg", 'width': width, 'height': height}
+            for key, name, width, height in (
+                ('default', 'default', 120, 90), ('medium', 'mqdefault', 320, 180),
+                ('high', 'hqdefault', 480, 360), ('standard', 'sddefault', 640, 480),
+                ('maxres', 'maxresdefault', 1280, 720)
+            )
+        }
+
+    def playlist_item(self, number, index):
+        video_id, published_at, title, description = self.video(number, index)
+        return {
+            'kind': 'youtube#playlistItem',
+            'etag': hashlib.md5(video_id.encode()).hexdigest(),
+            'id': f"UUfake{number:018d}.{video_id}",
+            'snippet': {
+                'publishedAt': published_at, 'channelId': fake_channel_id(number),
+                'playlistId': f"UUfake{number:018d}", 'position': index,
+                'title': title, 'description': description, 'thumbnails': self.thumbnails(video_id),
+                'channelTitle': f"Fake Channel {number}", 'resourceId': {'kind': 'youtube#video', 'videoId': video_id},
+                'videoOwnerChannelId': fake_channel_id(number), 'videoOwnerChannelTitle': f"Fake Channel {number}"
+            },
+            'contentDetails': {'videoId': video_id, 'videoPublishedAt': published_at}
+        }
+
+    def search_item(self, number, index):
+        video_id, published_at, title, description = self.video(number, index)
+        return {
+            'kind': 'youtube#searchResult',
+            'etag': hashlib.md5(video_id.encode()).hexdigest(),
+            'id': {'kind': 'youtube#video', 'videoId': video_id},
+            'snippet': {
+                'publishedAt': published_at, 'channelId': fake_channel_id(number), 'title': title,
+                'description': description, 'thumbnails': self.thumbnails(video_id),
+                'channelTitle': f"Fake Channel {number}", 'liveBroadcastContent': 'none'
+            }
+        }
+
+    def feed_entry(self, number, index):
+        video_id, published_at, title, description = self.video(number, index)
+        published_at = published_at.replace('Z', '+00:00')
+        channel_id = fake_channel_id(number)
+        return f"""
+ <entry>
+  <id>yt:video:{video_id}</id>
+  <yt:videoId>{video_id}</yt:videoId>
+  <yt:channelId>{channel_id}</yt:channelId>
+  <title>{escape(title)}</title>
+  <link rel="alternate" href="https://www.youtube.com/watch?v={video_id}"/>
+  <author>
+   <name>Fake Channel {number}</name>
+   <uri>https://www.youtube.com/channel/{channel_id}</uri>
+  </author>
+  <published>{published_at}</published>
+  <updated>{published_at}</updated>
+  <media:group>
+   <media:title>{escape(title)}</media:title>
+   <media:content url="https://www.youtube.com/v/{video_id}?version=3" type="application/x-shockwave-flash" width="640" height="390"/>
+   <media:thumbnail url={quoteattr(f"{self.url}vi/{video_id}/hqdefault.jpg")} width="480" height="360"/>
+   <media:description>{escape(description)}</media:description>
+   <media:community>
+    <media:starRating count="{number * 3 + index}" average="5.00" min="1" max="5"/>
+    <media:statistics views="{number * 1000 + index}"/>
+   </media:community>
+  </media:group>
+ </entry>"""
+
+    def channel_feed(self, channel_id):
+        """Retorna o feed Atom do canal (o gravado em feeds_dir, se houver), ou None se não existir."""
+        if self.feeds_dir:
+            path = os.path.join(self.feeds_dir, f"{channel_id}.xml")
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    return f.read()
+        try:
+            number = channel_number(channel_id)
+        except ValueError:
+            return None
+        entries = "".join(self.feed_entry(number, index) for index in range(min(FEED_ENTRIES, self.uploads_per_channel)))
+        return f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns:media="http://search.yahoo.com/mrss/" xmlns="http://www.w3.org/2005/Atom">
+ <link rel="self" href="http://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"/>
+ <id>yt:channel:{channel_id}</id>
+ <yt:channelId>{channel_id}</yt:channelId>
+ <title>Fake Channel {number}</title>
+ <link rel="alternate" href="https://www.youtube.com/channel/{channel_id}"/>
+ <author>
+  <name>Fake Channel {number}</name>
+  <uri>https://www.youtube.com/channel/{channel_id}</uri>
+ </author>
+ <published>{iso(BASE_TIME - 3650 * 86400).replace('Z', '+00:00')}</published>{entries}
+</feed>
+""".encode('utf-8')
+
+    # Métodos da API
+
+    def channels_list(self, params):
+        if 'id' in params:
+            numbers = [channel_number(channel_id) for channel_id in params['id'].split(',')]
+        else:
+            handle = params.get('forHandle') or params.get('forUsername') or ''
+            digits = ''.join(ch for ch in handle if ch.isdigit())
+            numbers = [int(digits)] if digits else []
+        items = [{
+            'kind': 'youtube#channel',
+            'id': fake_channel_id(number),
+            'snippet': {'title': f"Fake Channel {number}"},
+            'contentDetails': {'relatedPlaylists': {'uploads': f"UUfake{number:018d}"}}
+        } for number in numbers]
+        return {'kind': 'youtube#channelListResponse', 'items': items}
+
+    def playlist_items_list(self, params):
+        number = channel_number(params['playlistId'])
+        max_results = int(params.get('maxResults', 5))
+        start = int(params.get('pageToken') or 0)
+        end = min(start + max_results, self.uploads_per_channel)
+        response = {'kind': 'youtube#playlistItemListResponse',
+                    'items': [self.playlist_item(number, index) for index in range(start, end)]}
+        if end < self.uploads_per_channel:
+            response['nextPageToken'] = str(end)
+        return response
+
+    def search_list(self, params):
+        number = channel_number(params['channelId'])
+        max_results = int(params.get('maxResults', 5))
+        published_after = params.get('publishedAfter')
+        items = []
+        for index in range(self.uploads_per_channel):
+            if len(items) >= max_results:
+                break
+            item = self.search_item(number, index)
+            if published_after and item['snippet']['publishedAt'] <= published_after:
+                break
+            items.append(item)
+        return {'kind': 'youtube#searchListResponse', 'items': items}
+
+    def videos_list(self, params):
+        items = []
+        for video_id in params['id'].split(','):
+            seconds = 30 + int(video_id[-5:]) * 37 % 3600
+            items.append({
+                'kind': 'youtube#video', 'id': video_id,
+                'snippet': {'liveBroadcastContent': 'none'},
+                'contentDetails': {'duration': f"PT{seconds // 60}M{seconds % 60}S"},
+                'statistics': {'viewCount': str(int(video_id[1:6]) * 1000 + int(video_id[-5:]))}
+            })
+        return {'kind': 'youtube#videoListResponse', 'items': items}
+
+    # Servidor
+
+    def start(self, host='127.0.0.1', port=0):
+        """Inicia o servidor em segundo plano e retorna a URL base."""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def send(self, status, body=b'', content_type='application/json', headers=None):
+                # Comprimir as respostas de texto quando o cliente aceita gzip
+                if body and not content_type.startswith('image/') and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    body = gzip.compress(body)
+                    headers = dict(headers or {}, **{'Content-Encoding': 'gzip'})
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                with fake._lock:
+                    fake.bytes_sent += len(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                if url.path.startswith('/vi/'):
+                    fake.count('thumbnail')
+                    time.sleep(fake.thumbnail_latency)
+                    self.send(200, fake.thumbnail, 'image/jpeg')
+                    return
+
+                if url.path == '/feeds/videos.xml':
+                    fake.count('feed')
+                    time.sleep(fake.latency)
+                    body = fake.channel_feed(params.get('channel_id', ''))
+                    if body is None:
+                        self.send(404, b'', 'text/html')
+                        return
+                    etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                    if self.headers.get('If-None-Match') == etag:
+                        self.send(304, headers={'ETag': etag})
+                        return
+                    self.send(200, body, 'application/atom+xml; charset=UTF-8', headers={'ETag': etag})
+                    return
+
+                handlers = {
+                    '/youtube/v3/channels': fake.channels_list,
+                    '/youtube/v3/playlistItems': fake.playlist_items_list,
+                    '/youtube/v3/search': fake.search_list,
+                    '/youtube/v3/videos': fake.videos_list
+                }
+                handler = handlers.get(url.path)
+                if handler is None:
+                    self.send(404, b'{"error": {"code": 404, "message": "Not found"}}')
+                    return
+                fake.count(url.path.rsplit('/', 1)[-1])
+                time.sleep(fake.latency)
+
+                fault = fake.take_fault()
+                if fault:
+                    status, reason, retry_after = fault
+                    error = {'error': {'code': status, 'message': reason,
+                                       'errors': [{'reason': reason, 'domain': 'youtube.quota', 'message': reason}]}}
+                    self.send(status, json.dumps(error).encode('utf-8'),
+                              headers={'Retry-After': str(retry_after)} if retry_after is not None else None)
+                    return
+
+                response = handler(params)
+                etag = '"' + hashlib.md5(json.dumps(response).encode('utf-8')).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send(304, headers={'ETag': etag})
+                    return
+                response['etag'] = etag
+                if params.get('fields'):
+                    response = apply_fields(response, parse_fields(params['fields'])[0])
+                self.send(200, json.dumps(response).encode('utf-8'), headers={'ETag': etag})
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://{host}:{self._server.server_address[1]}/"
+        threading.Thread(target=self._server.serve_forever, name="fake-youtube", daemon=True).start()
+        return self.url
+
+    def stop(self):
+        """Encerra o servidor."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def count(self, name):
+        with self._lock:
+            self.requests[name] += 1
+
+    def fail_next(self, status, reason, count=1, retry_after=None):
+        """Faz as próximas count chamadas à API falharem com o status e o motivo (reason) dados."""
+        with self._lock:
+            self._faults.extend([(status, reason, retry_after)] * count)
+
+    def take_fault(self):
+        with self._lock:
+            return self._faults.pop(0) if self._faults else None
+
+    def reset_counters(self):
+        """Zera os contadores de requisições e bytes."""
+        with self._lock:
+            self.requests.clear()
+            self.bytes_sent = 0
+
+def main():
+    parser = argparse.ArgumentParser(description="API sintética do YouTube para benchmarks")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05, help="Latência (segundos) de cada chamada à API")
+    parser.add_argument('--thumbnail-latency', type=float, default=0.02, help="Latência (segundos) de cada miniatura")
+    parser.add_argument('--feeds-dir', help="Diretório com feeds RSS gravados (<channel_id>.xml)")
+    args = parser.parse_args()
+
+    fake = FakeYouTube(args.latency, args.thumbnail_latency, feeds_dir=args.feeds_dir)
+    url = fake.start(port=args.port)
+    print(f"API sintética em {url} (YOUTUBE_API_ENDPOINT={url}, YOUTUBE_FEED_URL={url}feeds/videos.xml)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""
+Benchmark do pipeline de busca do FlowTube contra a API sintética local.
+Para cada número de canais, roda em um processo novo (com data/ temporário) a busca
+inicial, a leitura em cache e a atualização forçada de get_cached_videos (tempo, chamadas,
+cota e bytes recebidos da API), o filtro filter_relevant_content, as consultas de página
+do feed e a renderização de main.py, sem gastar cota real. Os resultados são gravados em benchmarks/results/ para comparação.
+
+Uso:
+    python -m benchmarks.pipeline [--channels 10 100 1000] [--latency 0.05] [--backend rss] [--compare ARQUIVO]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+from benchmarks.fake_youtube import FakeYouTube, fake_channel_id
+from utils.fetcher import DEFAULT_FETCH_BACKEND, FETCH_BACKEND_PLAYLIST, FETCH_BACKEND_SEARCH, FETCH_BACKEND_RSS
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_PATH = os.path.join(ROOT_DIR, 'main.py')
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+
+# Palavras-chave usadas no filtro (parte delas aparece nos títulos sintéticos)
+KEYWORDS = ["python", "rust", "machine learning", "podcast", "linux"]
+
+# Repetições das medições rápidas (usa-se a mediana)
+REPEATS = 5
+
+def channel_urls(channels):
+    """URLs sintéticas; um em cada dez canais usa @handle, para exercitar a resolução."""
+    return [
+        f"https://www.youtube.com/@fake{i:05d}" if i % 10 == 0 else f"https://www.youtube.com/channel/{fake_channel_id(i)}"
+        for i in range(channels)
+    ]
+
+def median_time(function, repeats=REPEATS):
+    """Executa a função várias vezes e retorna (mediana dos tempos, último resultado)."""
+    times = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2], result
+
+def run_child(channels, max_results, backend):
+    """Executa as medições no processo atual (chamado no processo filho)."""
+    from utils.feed import config, get_cached_videos, filter_relevant_content, get_video_store
+    from utils.metrics import metrics
+    from utils.store import video_cursor
+
+    urls = channel_urls(channels)
+    config['channels'] = urls
+    config['channel_info'] = [{'url': url, 'name': url.rsplit('/', 1)[-1], 'id': None} for url in urls]
+    config['keywords'] = KEYWORDS
+    config['max_results'] = max_results
+    config['fetch_backend'] = backend
+    config.flush()
+
+    results = {'channels': channels, 'max_results': max_results, 'backend': backend}
+
+    def measure(name, function):
+        metrics.reset()
+        start = time.perf_counter()
+        value = function()
+        results[name] = {
+            'seconds': round(time.perf_counter() - start, 4),
+            'api_calls': sum(entry['calls'] for entry in metrics.api_summary()),
+            'quota': metrics.total_quota(),
+            'bytes': metrics.total_bytes()
+        }
+        return value
+
+    def forced_sync():
+        # Expirar todos os canais: o Atualizar do app não repete canais verificados há pouco
+        get_video_store().expire()
+        return get_cached_videos(urls, max_results, backend=backend)
+
+    videos = measure('cold_sync', lambda: get_cached_videos(urls, max_results, backend=backend))
+    measure('warm_sync', lambda: get_cached_videos(urls, max_results, backend=backend))
+    measure('forced_sync', forced_sync)
+    results['videos'] = len(videos)
+
+    seconds, matched = median_time(lambda: filter_relevant_content(videos, KEYWORDS))
+    results['filter_relevant_content'] = {'seconds': round(seconds, 5), 'matched': len(matched)}
+
+    # Consultas do feed: primeira página e uma página profunda (paginação por chave)
+    store = get_video_store()
+    channel_ids = [config['channel_ids'][url] for url in urls if url in config['channel_ids']]
+    seconds, _ = median_time(lambda: store.feed_page(channel_ids, KEYWORDS, limit=6))
+    results['feed_first_page'] = {'seconds': round(seconds, 5)}
+
+    def deep_page(pages=50):
+        after = None
+        for _ in range(pages):
+            page = store.feed_page(channel_ids, KEYWORDS, limit=6, after=after)
+            if not page:
+                break
+            after = video_cursor(page[-1])
+        return after
+    seconds, _ = median_time(deep_page, repeats=3)
+    results['feed_page_50'] = {'seconds': round(seconds, 5)}
+
+    # Renderização da página (inclui o download das miniaturas e o enriquecimento da página)
+    from streamlit.testing.v1 import AppTest
+    for name in ('render_first', 'render_warm'):
+        metrics.reset()
+        start = time.perf_counter()
+        app = AppTest.from_file(MAIN_PATH, default_timeout=600).run()
+        results[name] = {
+            'seconds': round(time.perf_counter() - start, 4),
+            'api_calls': sum(entry['calls'] for entry in metrics.api_summary()),
+            'thumbnails': metrics.thumbnails['downloads'],
+            'exceptions': [str(e.value) for e in app.exception]
+        }
+    return results
+
+def run_scenario(channels, max_results, backend, endpoint):
+    """Executa um cenário em um processo novo, com data/ temporário apontado para a API sintética."""
+    with tempfile.TemporaryDirectory(prefix='flowtube-bench-') as data_dir:
+        env = dict(os.environ, FLOWTUBE_DATA_DIR=data_dir, YOUTUBE_API_KEY='benchmark-key',
+                   YOUTUBE_API_ENDPOINT=endpoint, YOUTUBE_FEED_URL=f"{endpoint}feeds/videos.xml")
+        result = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.pipeline', '--child', str(channels), '--max-results', str(max_results),
+             '--backend', backend],
+            env=env, cwd=ROOT_DIR, capture_output=True, text=True
+        )
+    if result.returncode != 0:
+        raise RuntimeError(f"Cenário com {channels} canais falhou:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def git_revision():
+    """Retorna o commit atual, se disponível."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(current, previous):
+    """Mostra a variação de cada tempo em relação a uma execução anterior."""
+    previous_by_channels = {scenario['channels']: scenario for scenario in previous['scenarios']}
+    for scenario in current['scenarios']:
+        before = previous_by_channels.get(scenario['channels'])
+        if not before:
+            continue
+        print(f"\n{scenario['channels']} canais (antes -> agora):")
+        for name, value in scenario.items():
+            if isinstance(value, dict) and 'seconds' in value and isinstance(before.get(name), dict):
+                old, new = before[name]['seconds'], value['seconds']
+                change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+                print(f"  {name:24s} {old:10.4f}s -> {new:10.4f}s  {change}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline do FlowTube com a API sintética")
+    parser.add_argument('--channels', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--max-results', type=int, default=5)
+    parser.add_argument('--backend', default=DEFAULT_FETCH_BACKEND,
+                        choices=[FETCH_BACKEND_PLAYLIST, FETCH_BACKEND_SEARCH, FETCH_BACKEND_RSS])
+    parser.add_argument('--latency', type=float, default=0.05, help="Latência (segundos) de cada chamada à API")
+    parser.add_argument('--thumbnail-latency', type=float, default=0.02, help="Latência (segundos) de cada miniatura")
+    parser.add_argument('--output', help="Arquivo de resultados (padrão: benchmarks/results/pipeline-<data>.json)")
+    parser.add_argument('--compare', help="Resultados anteriores para comparação")
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(run_child(args.child, args.max_results, args.backend)))
+        return
+
+    fake = FakeYouTube(args.latency, args.thumbnail_latency)
+    endpoint = fake.start()
+    scenarios = []
+    try:
+        for channels in args.channels:
+            fake.reset_counters()
+            scenario = run_scenario(channels, args.max_results, args.backend, endpoint)
+            scenario['server_requests'] = dict(fake.requests)
+            scenario['server_bytes'] = fake.bytes_sent
+            scenarios.append(scenario)
+            print(json.dumps(scenario, indent=4))
+    finally:
+        fake.stop()
+
+    report = {
+        'benchmark': 'pipeline',
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'latency': args.latency,
+        'thumbnail_latency': args.thumbnail_latency,
+        'backend': args.backend,
+        'scenarios': scenarios
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4)
+    print(f"Resultados gravados em {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Verificação do backend RSS contra feeds gravados.
+Serve os feeds de benchmarks/feeds/ (<channel_id>.xml) pela API sintética local e confere
+o que request_feed_videos devolve: IDs, ordem, datas no formato do publishedAt da API,
+miniaturas, textos e o atalho do ETag (resposta 304). O mesmo arquivo também é lido
+diretamente por parse_feed, que deve dar o mesmo resultado.
+
+Uso:
+    python -m benchmarks.rss_check
+"""
+
+import os
+import sys
+import json
+
+from benchmarks.fake_youtube import FakeYouTube
+from utils.rss import parse_feed, request_feed_videos
+
+FEEDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'feeds')
+
+# Canal gravado e o que se espera do seu feed
+CHANNEL_ID = "UCrecordedFeedFlowTube00"
+EXPECTED = [
+    ('rEc0rd3d001', '2024-06-03T15:30:07Z', "Python & Rust: interoperabilidade com PyO3"),
+    ('rEc0rd3d002', '2024-05-28T09:00:00Z', "Podcast #42 — Linux no desktop em 2024"),
+    ('rEc0rd3d003', '2024-05-20T22:45:13Z', "Machine learning sem GPU #shorts")
+]
+
+def check_videos(videos):
+    """Compara os vídeos interpretados com os esperados e retorna a lista de problemas."""
+    problems = []
+    found = [(v['id']['videoId'], v['snippet']['publishedAt'], v['snippet']['title']) for v in videos]
+    if found != EXPECTED:
+        problems.append(f"vídeos {found} != {EXPECTED}")
+    for video in videos:
+        snippet = video['snippet']
+        video_id = video['id']['videoId']
+        if snippet['channelId'] != CHANNEL_ID or snippet['channelTitle'] != "FlowTube Gravado":
+            problems.append(f"{video_id}: canal {snippet['channelId']!r} / {snippet['channelTitle']!r}")
+        thumbnail = snippet['thumbnails'].get('high', {})
+        if not thumbnail.get('url', '').endswith(f"/vi/{video_id}/hqdefault.jpg") or (thumbnail['width'], thumbnail['height']) != (480, 360):
+            problems.append(f"{video_id}: miniatura {thumbnail}")
+    descriptions = [v['snippet']['description'] for v in videos]
+    if len(descriptions) == len(EXPECTED) and (not descriptions[0].startswith("Como chamar") or descriptions[1] != ''):
+        problems.append(f"descrições {descriptions}")
+    return problems
+
+def main():
+    problems = []
+    with open(os.path.join(FEEDS_DIR, f"{CHANNEL_ID}.xml"), 'rb') as f:
+        problems += [f"parse_feed: {p}" for p in check_videos(parse_feed(f))]
+
+    fake = FakeYouTube(feeds_dir=FEEDS_DIR)
+    url = fake.start()
+    os.environ['YOUTUBE_FEED_URL'] = f"{url}feeds/videos.xml"
+    try:
+        videos, etag = request_feed_videos(CHANNEL_ID)
+        problems += [f"request_feed_videos: {p}" for p in check_videos(videos)]
+        if not etag:
+            problems.append("request_feed_videos: resposta sem ETag")
+
+        # Com o ETag da resposta anterior, o feed inalterado volta como 304 (vídeos None)
+        unchanged, same_etag = request_feed_videos(CHANNEL_ID, etag=etag)
+        if unchanged is not None or same_etag != etag:
+            problems.append(f"If-None-Match: esperado (None, {etag!r}), recebido ({unchanged!r}, {same_etag!r})")
+
+        limited, _ = request_feed_videos(CHANNEL_ID, max_results=2)
+        if [v['id']['videoId'] for v in limited] != [video_id for video_id, _, _ in EXPECTED[:2]]:
+            problems.append("max_results: o feed não foi cortado nos mais recentes")
+    finally:
+        fake.stop()
+
+    print(json.dumps({'channel_id': CHANNEL_ID, 'feed_requests': fake.requests['feed'], 'problems': problems},
+                     indent=4, ensure_ascii=False))
+    sys.exit(1 if problems else 0)
+
+if __name__ == '__main__':
+    main()
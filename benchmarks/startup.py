@@ -0,0 +1,131 @@
+"""
+Benchmark de inicialização do FlowTube.
+Mede, em processos novos, o tempo até a primeira renderização de main.py com um feed
+já armazenado (sem chamadas à API), e informa quais módulos pesados foram importados
+pelo app e pelo atualizador em segundo plano (refresh.py, sem o Streamlit).
+
+Uso:
+    python -m benchmarks.startup [--runs 5] [--channels 100] [--videos 20]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_PATH = os.path.join(ROOT_DIR, 'main.py')
+
+# Módulos cuja importação deve ser adiada até o primeiro uso (da API ou da ordenação por relevância)
+HEAVY_MODULES = ['googleapiclient.discovery', 'googleapiclient.http', 'requests', 'PIL.Image', 'numpy']
+
+# Código executado em cada processo medido
+CHILD_CODE = """
+import sys, json, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file({main_path!r}, default_timeout=120).run()
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'first_render_s': elapsed,
+    'exceptions': [str(e.value) for e in at.exception],
+    'subheaders': [e.value for e in at.subheader],
+    'imported': [name for name in {heavy!r} if name in sys.modules]
+}}))
+"""
+
+# Código que importa o atualizador em segundo plano (o Streamlit carrega NumPy e PIL para o favicon
+# do app, então o atualizador é o que mostra se o código do FlowTube passou a importá-los)
+HEADLESS_CODE = """
+import sys, json
+import refresh
+print(json.dumps([name for name in {heavy!r} if name in sys.modules]))
+"""
+
+def prepare_data_dir(data_dir, channels, videos_per_channel):
+    """Cria uma configuração e um banco local com vídeos sintéticos já atualizados."""
+    sys.path.insert(0, ROOT_DIR)
+    from utils.store import VideoStore
+
+    channel_urls = [f"https://www.youtube.com/channel/UCbench{i:05d}" for i in range(channels)]
+    config = {
+        "channels": channel_urls,
+        "keywords": [],
+        "channel_ids": {url: url.rsplit('/', 1)[-1] for url in channel_urls},
+        "channel_info": [{'url': url, 'name': url.rsplit('/', 1)[-1], 'id': url.rsplit('/', 1)[-1]} for url in channel_urls],
+        "max_results": videos_per_channel,
+        "language": "en"
+    }
+    with open(os.path.join(data_dir, 'config.json'), 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+
+    store = VideoStore(os.path.join(data_dir, 'flowtube.db'))
+    for i, url in enumerate(channel_urls):
+        channel_id = config['channel_ids'][url]
+        videos = [{
+            'id': {'kind': 'youtube#video', 'videoId': f"v{i:05d}{j:03d}"},
+            'snippet': {
+                'publishedAt': f"2024-{1 + j % 12:02d}-{1 + i % 28:02d}T12:00:00Z",
+                'channelId': channel_id,
+                'title': f"Video {j} of channel {i}",
+                'description': "Synthetic benchmark video",
+                'thumbnails': {},
+                'channelTitle': f"Channel {i}"
+            }
+        } for j in range(videos_per_channel)]
+        store.replace(channel_id, videos, videos_per_channel)
+        # Detalhes já atualizados, para que a primeira renderização não precise da API
+        store.save_details([{'video_id': video['id']['videoId'], 'duration': 300, 'view_count': 1000,
+                             'live_status': 'none', 'is_short': False} for video in videos])
+
+def run_once(data_dir):
+    """Executa main.py em um processo novo e retorna as medições."""
+    env = dict(os.environ, FLOWTUBE_DATA_DIR=data_dir, YOUTUBE_API_KEY='benchmark-key')
+    code = CHILD_CODE.format(main_path=MAIN_PATH, heavy=HEAVY_MODULES)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code], env=env, cwd=ROOT_DIR,
+                            capture_output=True, text=True, check=True)
+    total = time.perf_counter() - start
+    measurement = json.loads(result.stdout.strip().splitlines()[-1])
+    measurement['process_s'] = total
+    return measurement
+
+def headless_imports(data_dir):
+    """Retorna os módulos pesados importados por refresh.py em um processo novo."""
+    env = dict(os.environ, FLOWTUBE_DATA_DIR=data_dir)
+    result = subprocess.run([sys.executable, '-c', HEADLESS_CODE.format(heavy=HEAVY_MODULES)], env=env, cwd=ROOT_DIR,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo até a primeira renderização do FlowTube")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--channels', type=int, default=100)
+    parser.add_argument('--videos', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='flowtube-bench-') as data_dir:
+        prepare_data_dir(data_dir, args.channels, args.videos)
+        runs = [run_once(data_dir) for _ in range(args.runs)]
+        headless = headless_imports(data_dir)
+
+    first_render = sorted(run['first_render_s'] for run in runs)
+    summary = {
+        'channels': args.channels,
+        'videos_per_channel': args.videos,
+        'runs': args.runs,
+        'first_render_median_s': round(first_render[len(first_render) // 2], 4),
+        'first_render_min_s': round(first_render[0], 4),
+        'process_median_s': round(sorted(run['process_s'] for run in runs)[len(runs) // 2], 4),
+        'heavy_modules_imported': runs[-1]['imported'],
+        'heavy_modules_imported_headless': headless,
+        'exceptions': runs[-1]['exceptions'],
+        'rendered': runs[-1]['subheaders']
+    }
+    print(json.dumps(summary, indent=4))
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,7 @@
 import streamlit as st
-import googleapiclient.discovery
-import googleapiclient.errors
-import os
-import json
-from datetime import datetime, timedelta
-import requests
-from PIL import Image
-from io import BytesIO
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-import base64
-import pickle
 
 # Configurar a página para melhor desempenho - deve ser o primeiro comando Streamlit
 st.set_page_config(
@@ -39,251 +31,114 @@ except Exception as e:
     def get_available_languages():
         return [("English", "en"), ("Português", "pt")]
 
-# Carregar variáveis de ambiente
-load_dotenv()
+# Importar as configurações padrão da busca
+from utils.fetcher import DEFAULT_MAX_WORKERS, DEFAULT_FETCH_BACKEND, get_thread_http
 
-# Configurar cliente da API do YouTube
-API_SERVICE_NAME = "youtube"
-API_VERSION = "v3"
+# Importar o filtro de palavras-chave compilado
+from utils.matcher import compile_keywords, video_text
 
-# Função para carregar a configuração
-def load_config():
-    # Caminho para o arquivo de configuração
-    config_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
-    config_file_path = os.path.join(config_dir, 'config.json')
-    
-    # Configuração padrão
-    default_config = {
-        "channels": [],
-        "keywords": [],
-        "channel_ids": {},  # Armazenar IDs de canais
-        "max_results": 5,   # Número padrão de vídeos por canal
-        "language": "pt",   # Idioma padrão
-        "channel_info": []  # Informações adicionais dos canais (como array)
-    }
-    
-    # Garantir que o diretório existe
-    os.makedirs(config_dir, exist_ok=True)
-    
-    try:
-        # Verificar se o arquivo existe e não está vazio
-        if os.path.exists(config_file_path) and os.path.getsize(config_file_path) > 0:
-            with open(config_file_path, 'r', encoding='utf-8') as config_file:
-                config = json.load(config_file)
-                
-                # Garantir que todos os campos necessários existam
-                if 'channel_ids' not in config:
-                    config['channel_ids'] = {}
-                if 'max_results' not in config:
-                    config['max_results'] = 5
-                if 'language' not in config:
-                    config['language'] = 'pt'
-                
-                # Garantir que channel_info seja um array
-                if 'channel_info' not in config or not isinstance(config['channel_info'], list):
-                    config['channel_info'] = []
-                
-                # Migrar canais de channels para channel_info se channel_info estiver vazio
-                if not config['channel_info'] and 'channels' in config and config['channels']:
-                    for channel_url in config['channels']:
-                        channel_id = config.get('channel_ids', {}).get(channel_url)
-                        
-                        # Extrair um nome mais amigável do canal
-                        if '@' in channel_url:
-                            # Extrair o nome após o @ e antes de qualquer barra
-                            channel_name = channel_url.split('@')[-1].split('/')[0]
-                        else:
-                            # Usar a URL como fallback
-                            channel_name = channel_url
-                        
-                        # Tentar obter o nome real do canal da API se tivermos um ID válido
-                        try:
-                            if channel_id and os.getenv('YOUTUBE_API_KEY'):
-                                youtube_temp = googleapiclient.discovery.build(
-                                    API_SERVICE_NAME, API_VERSION, 
-                                    developerKey=os.getenv('YOUTUBE_API_KEY'),
-                                    cache_discovery=False
-                                )
-                                
-                                request = youtube_temp.channels().list(
-                                    part="snippet",
-                                    id=channel_id
-                                )
-                                response = request.execute()
-                                
-                                if response.get('items'):
-                                    channel_name = response['items'][0]['snippet']['title']
-                        except Exception:
-                            # Se falhar, continuar com o nome extraído da URL
-                            pass
-                        
-                        config['channel_info'].append({
-                            'url': channel_url,
-                            'name': channel_name,
-                            'id': channel_id
-                        })
-                    
-                    # Salvar a configuração atualizada
-                    with open(config_file_path, 'w', encoding='utf-8') as config_file:
-                        json.dump(config, config_file, ensure_ascii=False, indent=4)
-                
-                return config
-        else:
-            # Criar arquivo de configuração padrão se não existir
-            with open(config_file_path, 'w', encoding='utf-8') as config_file:
-                json.dump(default_config, config_file, ensure_ascii=False, indent=4)
-            return default_config
-    except Exception as e:
-        # Em caso de erro, usar configuração padrão
-        st.error(f"Erro ao carregar configuração: {e}")
-        
-        # Tentar fazer backup do arquivo corrompido
-        if os.path.exists(config_file_path):
-            try:
-                backup_path = f"{config_file_path}.bak"
-                os.rename(config_file_path, backup_path)
-                st.warning(f"Arquivo de configuração corrompido. Backup criado em {backup_path}")
-            except:
-                pass
-        
-        # Criar novo arquivo de configuração
-        with open(config_file_path, 'w', encoding='utf-8') as config_file:
-            json.dump(default_config, config_file, ensure_ascii=False, indent=4)
-        
-        return default_config
+# Importar o enriquecimento de vídeos (duração, visualizações, live/short)
+from utils.enrichment import DEFAULT_DETAILS_TTL, enrich_videos, format_duration
 
-config = load_config()
+# Importar o cursor da paginação do banco local
+from utils.store import video_cursor
 
-# Função para salvar a configuração
-def save_config():
-    config_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
-    config_file_path = os.path.join(config_dir, 'config.json')
-    
-    # Garantir que o diretório existe
-    os.makedirs(config_dir, exist_ok=True)
-    
-    with open(config_file_path, 'w', encoding='utf-8') as config_file:
-        json.dump(config, config_file, ensure_ascii=False, indent=4)
+# Importar as ordens do feed (data ou relevância)
+from utils.config import SORT_DATE, SORT_RELEVANCE, DEFAULT_SORT
 
-# Inicializar cliente da API do YouTube
-@st.cache_resource
-def get_youtube_client():
-    try:
-        return googleapiclient.discovery.build(
-            API_SERVICE_NAME, API_VERSION, 
-            developerKey=os.getenv('YOUTUBE_API_KEY'),
-            cache_discovery=False
-        )
-    except Exception as e:
-        st.error(f"Erro ao inicializar cliente da API do YouTube: {e}")
-        return None
+# Importar o pipeline do feed (compartilhado com o atualizador em segundo plano)
+from utils.feed import (
+    config, youtube, set_reporter, get_video_store,
+    resolve_pending_channels, resolve_channel_ids, refresh_stale_channels, import_subscriptions, FORCE_REFRESH_WINDOW,
+    quota_reset_time, get_relevance_index
+)
+from utils.importer import parse_subscriptions
 
-# Obter cliente da API
-youtube = get_youtube_client()
+# Importar os modos de atualização (o app busca os canais ou apenas lê o banco do atualizador)
+from utils.config import REFRESH_MODE_DAEMON, DEFAULT_REFRESH_MODE
 
-# Função para obter ID do canal a partir da URL
-def get_channel_id(channel_url):
-    # Verificar se o ID já está em cache
-    if channel_url in config['channel_ids']:
-        return config['channel_ids'][channel_url]
+# Importar as métricas (API, miniaturas e fases do rerun)
+from utils.metrics import METRICS_PATH, metrics, redact_api_key
 
-    try:
-        if '/channel/' in channel_url:
-            # Extrair ID do canal da URL
-            channel_id = channel_url.split('/channel/')[1].split('/')[0]
-        elif '/user/' in channel_url or '/c/' in channel_url or '@' in channel_url:
-            # Extrair nome de usuário da URL
-            if '/user/' in channel_url:
-                username = channel_url.split('/user/')[1].split('/')[0]
-            elif '/c/' in channel_url:
-                username = channel_url.split('/c/')[1].split('/')[0]
-            else:
-                username = channel_url.split('/')[-1]
-            
-            if username.startswith('@'):
-                username = username[1:]  # Remover '@' se presente
-            
-            # Buscar ID do canal pelo nome de usuário
-            request = youtube.search().list(
-                part="snippet",
-                type="channel",
-                q=username,
-                maxResults=1
-            )
-            response = request.execute()
-            
-            if response['items']:
-                channel_id = response['items'][0]['snippet']['channelId']
-            else:
-                st.error(f"{get_text('error_channel_id', st.session_state.lang)} {channel_url}")
-                return None
-        else:
-            st.error(f"{get_text('invalid_url', st.session_state.lang)} {channel_url}")
-            return None
+# Importar o disjuntor de cota (aberto quando a cota diária da API acaba)
+from utils.ratelimit import quota_breaker
 
-        # Armazenar ID do canal em cache
-        config['channel_ids'][channel_url] = channel_id
-        save_config()
-        return channel_id
-    except Exception as e:
-        st.error(f"{get_text('error_occurred', st.session_state.lang)} {e}")
-        return None
+# Importar o cache de miniaturas
+from utils.thumbnails import ThumbnailCache, DEFAULT_CACHE_MB, PREFETCH_WORKERS
 
-# Função para buscar os vídeos mais recentes de um canal
-def fetch_latest_videos(channel_id, max_results=10):
-    try:
-        request = youtube.search().list(
-            part="snippet",
-            channelId=channel_id,
-            order="date",
-            type="video",
-            maxResults=max_results
-        )
-        response = request.execute()
-        return response['items']
-    except googleapiclient.errors.HttpError as e:
-        st.error(f"{get_text('error_occurred', st.session_state.lang)} {e}")
-        return []
-    except Exception as e:
-        st.error(f"{get_text('error_occurred', st.session_state.lang)} {e}")
-        return []
+# Carregar variáveis de ambiente
+load_dotenv()
 
-# Função para filtrar conteúdo relevante
-def filter_relevant_content(videos, keywords):
-    return [video for video in videos if any(keyword.lower() in video['snippet']['title'].lower() or 
-                                             keyword.lower() in video['snippet']['description'].lower() 
-                                             for keyword in keywords)]
+# Função para salvar a configuração (alterações seguidas geram uma só gravação atômica)
+def save_config():
+    config.save()
 
-# Cache de vídeos
-@st.cache_data(ttl=86400)  # Cache por 24 horas
-def get_cached_videos(channels, max_results=5, keywords=None):
-    all_videos = []
-    
-    for channel in channels:
-        channel_id = get_channel_id(channel)
-        if channel_id:
-            videos = fetch_latest_videos(channel_id, max_results)
-            all_videos.extend(videos)
-        else:
-            st.warning(get_text('skipping_channel', st.session_state.lang).format(channel))
-    
-    # Filtrar por palavras-chave se fornecidas
-    if keywords and len(keywords) > 0:
-        all_videos = filter_relevant_content(all_videos, keywords)
-    
-    # Ordenar por data de publicação (mais recente primeiro)
-    all_videos.sort(key=lambda x: x['snippet']['publishedAt'], reverse=True)
-    
-    return all_videos
+# Função para exibir na página os avisos e erros do pipeline do feed
+def streamlit_reporter(level, key, *args):
+    text = get_text(key, st.session_state.get('lang', config.get('language', 'pt')))
+    message = text.format(*args) if '{}' in text else " ".join([text, *(str(arg) for arg in args)])
+    if level == 'error':
+        st.error(message)
+    else:
+        st.warning(message)
+
+set_reporter(streamlit_reporter)
+
+# Cache de miniaturas em disco, compartilhado entre sessões
+@st.cache_resource
+def get_thumbnail_cache():
+    return ThumbnailCache(max_bytes=config.get('thumbnail_cache_mb', DEFAULT_CACHE_MB) * 1024 * 1024)
+
+# Pool de threads para pré-carregar miniaturas em segundo plano
+@st.cache_resource
+def get_prefetch_executor():
+    return ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="flowtube-thumbs")
+
+# Painel de depuração com as métricas do processo
+def render_metrics_panel():
+    lang = st.session_state.lang
+    with st.sidebar.expander(get_text('metrics_panel', lang), expanded=True):
+        st.caption(f"{get_text('metrics_quota', lang)}: {metrics.total_quota()}")
+        
+        # Chamadas à API por método (cota, erros e latência)
+        api_summary = metrics.api_summary()
+        if api_summary:
+            st.dataframe(api_summary, hide_index=True)
+        
+        # Fases do último rerun completo
+        if metrics.last_rerun:
+            st.caption(get_text('metrics_last_rerun', lang))
+            st.text("\n".join(f"{name}: {seconds * 1000:.0f} ms" for name, seconds in metrics.last_rerun.items()))
+        
+        # Downloads de miniaturas
+        thumbnails = metrics.thumbnails
+        if thumbnails['downloads']:
+            st.caption(
+                f"{get_text('metrics_thumbnails', lang)}: {thumbnails['downloads']} "
+                f"({thumbnails['errors']} {get_text('metrics_errors', lang)}, "
+                f"{thumbnails['seconds'] / thumbnails['downloads'] * 1000:.0f} ms, {thumbnails['bytes'] // 1024} KB)"
+            )
+        
+        # Erros reportados mais recentes
+        for _, key, detail in list(metrics.errors)[-5:]:
+            st.caption(f"⚠ {key}: {detail}")
 
 # Aplicativo Streamlit
 def main():
+    # Combinar as alterações gravadas pelo refresh.py (IDs e playlists resolvidos) desde o último rerun
+    config.reload()
+    
+    # Gravar as métricas em data/metrics.jsonl (desativado com "metrics_log": false)
+    metrics.configure(METRICS_PATH if config.get('metrics_log', True) else None)
+    
+    # Migrações da configuração que dependem da API rodam uma vez, em segundo plano
+    config.start_migrations(config.get('max_workers', DEFAULT_MAX_WORKERS))
+    
     # Inicializar variáveis de estado para o player de vídeo e paginação
     if 'show_video' not in st.session_state:
         st.session_state.show_video = False
         st.session_state.current_video_id = None
         st.session_state.current_video_title = None
-        st.session_state.watched_videos = set()
         st.session_state.page = 0
     
     # Inicializar estrutura de channel_info se não existir no config
@@ -338,10 +193,15 @@ def main():
             submitted = st.form_submit_button(get_text('add_channel', st.session_state.lang))
             
             if submitted and new_channel:
-                # Verificar se o canal é válido
-                channel_id = get_channel_id(new_channel)
+                # Verificar se o canal é válido (ignorando falhas anteriores em cache)
+                titles = resolve_pending_channels([new_channel], retry_failed=True)
+                channel_id = config['channel_ids'].get(new_channel)
                 
                 if channel_id:
+                    # Usar o título obtido na resolução, quando houver
+                    if not channel_name:
+                        channel_name = titles.get(new_channel)
+                    
                     # Se o nome do canal não for fornecido, tentar obter da API
                     if not channel_name:
                         try:
@@ -349,28 +209,59 @@ def main():
                                 part="snippet",
                                 id=channel_id
                             )
-                            response = request.execute()
-                            if response['items']:
+                            response = request.execute(http=get_thread_http())
+                            if response.get('items'):
                                 channel_name = response['items'][0]['snippet']['title']
                             else:
                                 channel_name = new_channel
                         except Exception as e:
-                            st.error(f"{get_text('error_occurred', st.session_state.lang)} {str(e)}")
+                            st.error(f"{get_text('error_occurred', st.session_state.lang)} {redact_api_key(str(e))}")
                             channel_name = new_channel
                     
                     # Adicionar canal com nome amigável
                     if new_channel not in [c['url'] for c in config.get('channel_info', [])]:
-                        config['channel_info'].append({
-                            'url': new_channel,
-                            'name': channel_name,
-                            'id': channel_id
-                        })
-                        config['channels'] = [c['url'] for c in config['channel_info']]
+                        # Listas aninhadas são alteradas com o lock da configuração (a gravação roda em outra thread)
+                        with config.lock:
+                            config['channel_info'].append({
+                                'url': new_channel,
+                                'name': channel_name,
+                                'id': channel_id
+                            })
+                            config['channels'] = [c['url'] for c in config['channel_info']]
                         save_config()
                         st.success(f"{get_text('channel_added', st.session_state.lang)} '{channel_name}'!")
                         st.rerun()
                 else:
                     st.error(get_text('invalid_channel', st.session_state.lang))
+        
+        # Importação em lote das inscrições (CSV do Google Takeout ou OPML)
+        with st.form("import_channels_form", clear_on_submit=True):
+            subscriptions_file = st.file_uploader(
+                get_text('import_file', st.session_state.lang),
+                type=['csv', 'opml', 'xml'],
+                help=get_text('import_help', st.session_state.lang)
+            )
+            import_submitted = st.form_submit_button(get_text('import_channels', st.session_state.lang))
+            
+            if import_submitted and subscriptions_file is not None:
+                try:
+                    entries = parse_subscriptions(subscriptions_file.name, subscriptions_file.getvalue())
+                except ValueError as e:
+                    st.error(f"{get_text('import_invalid_file', st.session_state.lang)} {e}")
+                    entries = None
+                
+                if entries:
+                    progress_bar = st.progress(0.0, text=get_text('import_progress', st.session_state.lang))
+                    added, existing, not_found = import_subscriptions(
+                        entries,
+                        progress=lambda done, total: progress_bar.progress(
+                            done / total, text=f"{get_text('import_progress', st.session_state.lang)} {done}/{total}"
+                        )
+                    )
+                    progress_bar.empty()
+                    st.success(get_text('import_result', st.session_state.lang).format(added, existing, not_found))
+                elif entries is not None:
+                    st.warning(get_text('import_empty', st.session_state.lang))
     
     with channel_tab2:
         if not config.get('channel_info', []):
@@ -396,6 +287,11 @@ def main():
                 word-break: break-all;
                 margin-bottom: 10px;
             }
+            .channel-stale {
+                color: #ffa64d;
+                font-size: 12px;
+                margin-bottom: 5px;
+            }
             .remove-button {
                 display: flex;
                 justify-content: center;
@@ -404,14 +300,23 @@ def main():
             </style>
             """, unsafe_allow_html=True)
             
+            # Canais cuja última atualização falhou (exibidos com os vídeos armazenados)
+            channel_errors = get_video_store().channel_errors()
+            
             # Exibir lista de canais com opção de remoção
             for i, channel in enumerate(config['channel_info']):
                 # Usar container para melhor espaçamento
                 with st.container():
+                    failure = channel_errors.get(channel.get('id') or config['channel_ids'].get(channel['url']))
+                    stale_html = ""
+                    if failure:
+                        failed_at = f"{datetime.fromtimestamp(failure[1]):%d/%m %H:%M}"
+                        stale_html = f'<div class="channel-stale">⚠ {get_text("channel_stale", st.session_state.lang).format(failed_at)}</div>'
                     # Usar HTML para formatar melhor o nome e URL do canal
                     st.markdown(f"""
                     <div class="channel-container">
                         <div class="channel-name">{channel.get('name', channel['url'])}</div>
+                        {stale_html}
                         <div class="channel-url">{channel['url']}</div>
                     </div>
                     """, unsafe_allow_html=True)
@@ -420,8 +325,9 @@ def main():
                     col1, col2, col3 = st.columns([1, 2, 1])
                     with col2:
                         if st.button(get_text('remove', st.session_state.lang), key=f"remove_{i}"):
-                            config['channel_info'].pop(i)
-                            config['channels'] = [c['url'] for c in config['channel_info']]
+                            with config.lock:
+                                config['channel_info'].pop(i)
+                                config['channels'] = [c['url'] for c in config['channel_info']]
                             save_config()
                             st.success(get_text('channel_removed', st.session_state.lang))
                             st.rerun()
@@ -445,10 +351,37 @@ def main():
         help=get_text('videos_per_channel_help', st.session_state.lang)
     )
     
+    # Ocultar do feed os vídeos já assistidos (filtro aplicado na consulta do banco)
+    hide_watched = st.sidebar.checkbox(
+        get_text('hide_watched', st.session_state.lang),
+        value=config.get('hide_watched', False),
+        help=get_text('hide_watched_help', st.session_state.lang)
+    )
+    
+    # Limpar o histórico de assistidos (os vídeos voltam a aparecer no feed)
+    watched_count = get_video_store().count_watched()
+    if watched_count and st.sidebar.button(get_text('clear_watched', st.session_state.lang).format(watched_count)):
+        get_video_store().unmark_watched()
+        st.rerun()
+    
+    # Ordem do feed: por data ou por relevância das palavras-chave (com peso para os mais recentes)
+    sort_options = [SORT_DATE, SORT_RELEVANCE]
+    sort_names = [get_text(f"sort_{option}", st.session_state.lang) for option in sort_options]
+    current_sort = config.get('sort_order', DEFAULT_SORT)
+    selected_sort_name = st.sidebar.selectbox(
+        get_text('sort_order', st.session_state.lang),
+        sort_names,
+        index=sort_options.index(current_sort) if current_sort in sort_options else 0,
+        help=get_text('sort_order_help', st.session_state.lang)
+    )
+    sort_order = sort_options[sort_names.index(selected_sort_name)]
+    
     # Botão para salvar configuração
     if st.sidebar.button(get_text('save_config', st.session_state.lang)):
         config['keywords'] = keywords
         config['max_results'] = max_results
+        config['hide_watched'] = hide_watched
+        config['sort_order'] = sort_order
         save_config()
         st.sidebar.success(get_text('config_saved', st.session_state.lang))
     
@@ -456,6 +389,10 @@ def main():
     for _ in range(5):
         st.sidebar.text("")
     
+    # Painel de depuração opcional com as métricas de API, cota e tempo de cada fase
+    if st.sidebar.checkbox(get_text('show_metrics', st.session_state.lang), key='show_metrics'):
+        render_metrics_panel()
+    
     # Rodapé com créditos
     st.sidebar.markdown("---")
     st.sidebar.markdown(get_text('inspired_by', st.session_state.lang), unsafe_allow_html=True)
@@ -464,7 +401,7 @@ def main():
     col_refresh, col_modal = st.columns([5, 1])
     with col_refresh:
         if st.button(get_text('refresh_videos', st.session_state.lang)):
-            st.cache_data.clear()
+            st.session_state.force_refresh = True
             st.rerun()
     
     # Exibir player de vídeo se um vídeo estiver selecionado
@@ -528,63 +465,186 @@ def main():
     channels = [c['url'] for c in config.get('channel_info', [])] if config.get('channel_info') else config.get('channels', [])
     
     if channels:
-        videos = get_cached_videos(channels, max_results, keywords)
+        # No modo daemon o app apenas lê o banco; o atualizador em segundo plano faz as chamadas à API
+        daemon_mode = config.get('refresh_mode', DEFAULT_REFRESH_MODE) == REFRESH_MODE_DAEMON
+        with metrics.phase('resolve_channels'):
+            channel_ids, channel_urls = resolve_channel_ids(channels, resolve=not daemon_mode)
+        refresh_args = (
+            channel_ids, channel_urls, max_results,
+            config.get('max_workers', DEFAULT_MAX_WORKERS),
+            config.get('fetch_backend', DEFAULT_FETCH_BACKEND)
+        )
+        force_refresh = st.session_state.pop('force_refresh', False)
+        store = get_video_store()
+        
+        if daemon_mode:
+            # Atualizar (forçado) apenas marca os canais como vencidos para o próximo ciclo do atualizador
+            if force_refresh:
+                store.expire(channel_ids, min_age=FORCE_REFRESH_WINDOW)
+        else:
+            # Canais nunca buscados são buscados agora; os vencidos só depois de exibir o feed em cache
+            with metrics.phase('refresh_new'):
+                refresh_stale_channels(*refresh_args, force_refresh=force_refresh, only_new=not force_refresh)
+        page_video_ids = []
+        
+        # Cota diária esgotada: o feed exibe os vídeos já armazenados até a renovação
+        if quota_breaker.is_open():
+            st.warning(get_text('quota_exhausted', st.session_state.lang).format(quota_reset_time()))
+        
+        # Canais cuja última atualização falhou: o feed exibe os vídeos já armazenados deles
+        stale_channels = store.channel_errors(channel_ids)
+        if stale_channels:
+            st.caption("⚠ " + get_text('stale_channels', st.session_state.lang).format(
+                len(stale_channels), ", ".join(channel_urls.get(channel_id, channel_id) for channel_id in stale_channels)
+            ))
         
-        if not videos:
+        # Busca textual em todo o histórico armazenado (não usa a API)
+        search_query = st.text_input(
+            get_text('search_videos', st.session_state.lang),
+            help=get_text('search_help', st.session_state.lang)
+        ).strip()
+        
+        # Ordenação por relevância: o feed inteiro é pontuado de uma vez (índice em memória)
+        by_relevance = not search_query and sort_order == SORT_RELEVANCE
+        
+        with metrics.phase('feed_query'):
+            if search_query:
+                total_videos = store.count_search(search_query)
+            elif by_relevance:
+                ranked_ids = get_relevance_index().rank(channel_ids, keywords, hide_watched)
+                total_videos = len(ranked_ids)
+            else:
+                total_videos = store.count_feed(channel_ids, keywords, hide_watched)
+        
+        if not total_videos:
             st.info(get_text('no_videos', st.session_state.lang))
         else:
-            st.subheader(f"{get_text('found_videos', st.session_state.lang)}: {len(videos)}")
+            st.subheader(f"{get_text('found_videos', st.session_state.lang)}: {total_videos}")
             
             # Configuração de paginação
             videos_per_page = 6  # 2 linhas de 3 vídeos
-            total_pages = max(1, (len(videos) + videos_per_page - 1) // videos_per_page)
+            total_pages = max(1, (total_videos + videos_per_page - 1) // videos_per_page)
+            
+            # Paginação por chave: cada página começa depois do último vídeo da anterior
+            feed_key = (tuple(channel_ids), tuple(keywords), search_query, hide_watched, sort_order)
+            if st.session_state.get('feed_key') != feed_key:
+                st.session_state.feed_key = feed_key
+                st.session_state.page_cursors = {0: None}
+            page_cursors = st.session_state.page_cursors
             
             # Garantir que a página atual é válida
-            if st.session_state.page >= total_pages:
+            keyset_paging = not search_query and not by_relevance
+            if st.session_state.page >= total_pages or (keyset_paging and st.session_state.page not in page_cursors):
                 st.session_state.page = 0
             
-            # Calcular índices de início e fim para a página atual
+            # Índice do primeiro vídeo da página atual
             start_idx = st.session_state.page * videos_per_page
-            end_idx = min(start_idx + videos_per_page, len(videos))
             
             # Exibir vídeos da página atual
-            current_videos = videos[start_idx:end_idx]
+            with metrics.phase('feed_query'):
+                if search_query:
+                    # Resultados ordenados por relevância: paginação por deslocamento
+                    current_videos = store.search(search_query, limit=videos_per_page, offset=start_idx)
+                elif by_relevance:
+                    # Feed ordenado por relevância: paginação por deslocamento na lista pontuada
+                    current_videos = store.get_videos(ranked_ids[start_idx:start_idx + videos_per_page])
+                else:
+                    current_videos = store.feed_page(
+                        channel_ids, keywords, limit=videos_per_page,
+                        after=page_cursors[st.session_state.page], hide_watched=hide_watched
+                    )
+                    if current_videos:
+                        page_cursors[st.session_state.page + 1] = video_cursor(current_videos[-1])
+            
+            # Buscador compilado para mostrar as palavras-chave encontradas em cada vídeo
+            matcher = compile_keywords(tuple(keywords))
+            
+            with metrics.phase('thumbnails'):
+                # Baixar em paralelo as miniaturas da página atual e, em segundo plano, as da próxima
+                thumbnail_cache = get_thumbnail_cache()
+                thumbnail_cache.prefetch([video.thumbnail_url for video in current_videos])
+                next_videos = []
+                if st.session_state.page < total_pages - 1 and current_videos:
+                    if search_query:
+                        next_videos = store.search(search_query, limit=videos_per_page, offset=start_idx + videos_per_page)
+                    elif by_relevance:
+                        next_videos = store.get_videos(ranked_ids[start_idx + videos_per_page:start_idx + 2 * videos_per_page])
+                    else:
+                        next_videos = store.feed_page(
+                            channel_ids, keywords, limit=videos_per_page,
+                            after=page_cursors[st.session_state.page + 1], hide_watched=hide_watched
+                        )
+                thumbnail_cache.prefetch([video.thumbnail_url for video in next_videos], executor=get_prefetch_executor())
+            
+            # Detalhes já armazenados da página atual e da próxima (os vencidos são buscados depois)
+            page_video_ids = [video.video_id for video in current_videos + next_videos]
+            video_details = store.get_details(page_video_ids)
+            
+            # Vídeos da página atual que já foram assistidos (histórico persistente no banco)
+            watched_ids = store.watched([video.video_id for video in current_videos])
             
             # Exibir grade de vídeos (2 linhas de 3 vídeos)
-            for i in range(0, len(current_videos), 3):
-                cols = st.columns(3)
-                for j in range(3):
-                    if i + j < len(current_videos):
-                        video = current_videos[i + j]
-                        with cols[j]:
-                            # Obter miniatura
-                            thumbnail_url = video['snippet']['thumbnails']['high']['url']
-                            response = requests.get(thumbnail_url)
-                            img = Image.open(BytesIO(response.content))
-                            st.image(img, use_container_width=True)
+            with metrics.phase('render_grid'):
+                for i in range(0, len(current_videos), 3):
+                    cols = st.columns(3)
+                    for j in range(3):
+                        if i + j < len(current_videos):
+                            video = current_videos[i + j]
+                            with cols[j]:
+                                # Obter miniatura do cache em disco (sem decodificar com PIL)
+                                thumbnail_url = video.thumbnail_url
+                                thumbnail_path = thumbnail_cache.get(thumbnail_url) if thumbnail_url else None
+                                if thumbnail_path or thumbnail_url:
+                                    st.image(thumbnail_path or thumbnail_url, use_container_width=True)
+                            
+                                # Título e canal do vídeo
+                                st.markdown(f"**{video.title}**")
+                                st.write(f"{video.channel_title}")
+                                st.write(f"{get_text('published', st.session_state.lang)}: {video.published_at[:10]}")
                             
-                            # Título e canal do vídeo
-                            st.markdown(f"**{video['snippet']['title']}**")
-                            st.write(f"{video['snippet']['channelTitle']}")
-                            st.write(f"{get_text('published', st.session_state.lang)}: {video['snippet']['publishedAt'][:10]}")
+                                # Duração, visualizações e status de live/short
+                                details = video_details.get(video.video_id)
+                                if details:
+                                    badges = []
+                                    if details['live_status'] == 'live':
+                                        badges.append(f"🔴 {get_text('live_badge', st.session_state.lang)}")
+                                    elif details['live_status'] == 'upcoming':
+                                        badges.append(f"⏰ {get_text('upcoming_badge', st.session_state.lang)}")
+                                    elif details['duration']:
+                                        badges.append(f"⏱ {format_duration(details['duration'])}")
+                                    if details['is_short']:
+                                        badges.append(get_text('short_badge', st.session_state.lang))
+                                    if details['view_count'] is not None:
+                                        badges.append(f"{details['view_count']:,} {get_text('views', st.session_state.lang)}")
+                                    if badges:
+                                        st.caption(" · ".join(badges))
+                                if matcher:
+                                    matched_keywords = matcher.matches(video_text(video))
+                                    if matched_keywords:
+                                        st.caption(f"{get_text('matched_keywords', st.session_state.lang)}: {', '.join(matched_keywords)}")
                             
-                            # Verificar se o vídeo já foi assistido
-                            video_id = video['id']['videoId']
-                            video_title = video['snippet']['title']
-                            watched = video_id in st.session_state.watched_videos
+                                # Verificar se o vídeo já foi assistido
+                                video_id = video.video_id
+                                video_title = video.title
+                                watched = video_id in watched_ids
                             
-                            # Botão de reprodução com indicador de assistido
-                            video_number = start_idx + i + j + 1
-                            button_text = f"{get_text('play_video', st.session_state.lang)} {video_number}"
-                            if watched:
-                                button_text = f"🔵 {get_text('watched_indicator', st.session_state.lang)}: {button_text}"
+                                # Botão de reprodução com indicador de assistido
+                                video_number = start_idx + i + j + 1
+                                button_text = f"{get_text('play_video', st.session_state.lang)} {video_number}"
+                                if watched:
+                                    button_text = f"🔵 {get_text('watched_indicator', st.session_state.lang)}: {button_text}"
                             
-                            if st.button(button_text, key=f"play_{video_id}"):
-                                st.session_state.show_video = True
-                                st.session_state.current_video_id = video_id
-                                st.session_state.current_video_title = video_title
-                                st.session_state.watched_videos.add(video_id)
-                                st.rerun()
+                                if st.button(button_text, key=f"play_{video_id}"):
+                                    st.session_state.show_video = True
+                                    st.session_state.current_video_id = video_id
+                                    st.session_state.current_video_title = video_title
+                                    store.mark_watched([video_id])
+                                    st.rerun()
+                                
+                                # Desfazer a marcação de assistido (ex.: clique por engano)
+                                if watched and st.button(get_text('unmark_watched', st.session_state.lang), key=f"unwatch_{video_id}"):
+                                    store.unmark_watched([video_id])
+                                    st.rerun()
             
             # Controles de paginação
             if total_pages > 1:
@@ -603,8 +663,26 @@ def main():
                         if st.button(f"{get_text('next', st.session_state.lang)} ▶"):
                             st.session_state.page += 1
                             st.rerun()
+        
+        # Depois de exibir o feed: atualizar os canais vencidos e enriquecer a página atual e a
+        # próxima com uma única chamada de videos().list; recarregar se chegou algo novo.
+        # No modo daemon isso é feito pelo atualizador em segundo plano.
+        if not daemon_mode:
+            version = store.version
+            if not force_refresh:
+                with metrics.phase('refresh_stale'):
+                    refresh_stale_channels(*refresh_args)
+            with metrics.phase('enrich'):
+                enriched = enrich_videos(
+                    youtube, store, page_video_ids,
+                    ttl=config.get('details_ttl', DEFAULT_DETAILS_TTL)
+                ) if page_video_ids else 0
+            if store.version != version or enriched:
+                st.rerun()
     else:
         st.info(get_text('add_channels_prompt', st.session_state.lang))
 
 if __name__ == "__main__":
-    main()
+    # Cada rerun é medido; as fases são gravadas nas métricas ao final
+    with metrics.rerun():
+        main()
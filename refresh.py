@@ -0,0 +1,136 @@
+"""
+Atualizador em segundo plano do FlowTube.
+Lê data/config.json e atualiza os canais periodicamente no banco local (data/flowtube.db),
+sem interface. Com "refresh_mode": "daemon" na configuração, o app apenas lê o banco e
+nenhuma chamada à API é feita durante o carregamento da página. Com --backfill, cada ciclo
+também importa páginas mais antigas do histórico dos canais, retomando de onde parou.
+
+Uso:
+    python refresh.py [--interval 900] [--once] [--enrich 60] [--backfill 20]
+"""
+
+import time
+import argparse
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from utils.config import DEFAULT_REFRESH_INTERVAL
+from utils.fetcher import DEFAULT_MAX_WORKERS, DEFAULT_FETCH_BACKEND
+from utils.enrichment import DEFAULT_DETAILS_TTL, enrich_videos
+from utils.scheduler import DEFAULT_QUOTA_BUDGET, quota_day
+from utils.metrics import METRICS_PATH, metrics, redact_api_key
+from utils.feed import (
+    config, youtube, get_video_store, resolve_channel_ids, refresh_stale_channels, backfill_channels, set_reporter,
+    quota_reset_time
+)
+from utils.ratelimit import quota_breaker
+
+# Número padrão de vídeos mais recentes do feed enriquecidos a cada ciclo
+DEFAULT_ENRICH_COUNT = 60
+
+def log(message):
+    """Escreve uma linha de log com data e hora."""
+    print(f"{datetime.now():%Y-%m-%d %H:%M:%S} {message}", flush=True)
+
+def log_reporter(level, key, *args):
+    """Relator do pipeline do feed que escreve os avisos e erros no log."""
+    log(f"{level.upper()} {key}: {' '.join(str(arg) for arg in args)}")
+
+def configured_channels():
+    """Retorna as URLs dos canais configurados (mesma regra do app)."""
+    if config.get('channel_info'):
+        return [c['url'] for c in config['channel_info']]
+    return config.get('channels', [])
+
+def refresh_cycle(enrich_count=DEFAULT_ENRICH_COUNT, backfill_pages=0):
+    """Executa um ciclo: relê a configuração, atualiza os canais vencidos pela agenda, enriquece o topo
+    do feed e, com backfill_pages, importa até esse número de páginas antigas de cada canal."""
+    if config.reload():
+        log("Configuração carregada")
+
+    channels = configured_channels()
+    if not channels:
+        log("Nenhum canal configurado")
+        return
+
+    store = get_video_store()
+    keywords = config.get('keywords', [])
+    channel_ids, channel_urls = resolve_channel_ids(channels)
+    matching_before = store.count_feed(channel_ids, keywords)
+
+    start = time.perf_counter()
+    received_before = metrics.total_bytes()
+    with metrics.phase('refresh_stale'):
+        results, errors = refresh_stale_channels(
+            channel_ids, channel_urls,
+            config.get('max_results', 5),
+            config.get('max_workers', DEFAULT_MAX_WORKERS),
+            config.get('fetch_backend', DEFAULT_FETCH_BACKEND)
+        )
+    new_videos = sum(results.values())
+    new_matching = store.count_feed(channel_ids, keywords) - matching_before
+
+    # Duração, visualizações e status de live/short dos vídeos mais recentes do feed
+    enriched = 0
+    if enrich_count:
+        video_ids = [video.video_id for video in store.feed_page(channel_ids, keywords, limit=enrich_count)]
+        with metrics.phase('enrich'):
+            enriched = enrich_videos(youtube, store, video_ids, ttl=config.get('details_ttl', DEFAULT_DETAILS_TTL))
+
+    # Histórico antigo dos canais (50 vídeos e 1 unidade de cota por página)
+    backfilled = 0
+    if backfill_pages:
+        with metrics.phase('backfill'):
+            backfill_results, _ = backfill_channels(
+                channel_ids, channel_urls, backfill_pages, config.get('max_workers', DEFAULT_MAX_WORKERS)
+            )
+        backfilled = sum(backfill_results.values())
+
+    # Gravar já as alterações do ciclo (IDs e playlists resolvidos), antes de dormir; sem alterações
+    # o arquivo não é gravado, e as feitas no app durante o ciclo são combinadas, não sobrescritas
+    config.flush()
+    log(
+        f"{len(results)}/{len(channel_ids)} canais atualizados, {len(errors)} com falha, "
+        f"{new_videos} vídeos novos ({new_matching} com as palavras-chave), "
+        f"{enriched} detalhes buscados, {backfilled} vídeos antigos importados em {time.perf_counter() - start:.1f}s "
+        f"({(metrics.total_bytes() - received_before) / 1024:.0f} KB recebidos); "
+        f"cota de hoje: {store.quota_used(quota_day())}/{config.get('daily_quota_budget', DEFAULT_QUOTA_BUDGET)}"
+    )
+    if quota_breaker.is_open():
+        log(f"Cota diária da API esgotada; chamadas suspensas até {quota_reset_time()}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Atualizador em segundo plano do FlowTube")
+    parser.add_argument('--interval', type=int, default=None,
+                        help=f"Segundos entre os ciclos (padrão: refresh_interval do config ou {DEFAULT_REFRESH_INTERVAL})")
+    parser.add_argument('--once', action='store_true', help="Executar um único ciclo e sair")
+    parser.add_argument('--enrich', type=int, default=DEFAULT_ENRICH_COUNT,
+                        help="Vídeos mais recentes do feed enriquecidos a cada ciclo (0 desativa)")
+    parser.add_argument('--backfill', type=int, default=0, metavar='PAGES',
+                        help="Páginas antigas (50 vídeos) importadas de cada canal a cada ciclo (0 desativa)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    set_reporter(log_reporter)
+    metrics.configure(METRICS_PATH if config.get('metrics_log', True) else None)
+
+    try:
+        while True:
+            interval = args.interval or config.get('refresh_interval', DEFAULT_REFRESH_INTERVAL)
+            try:
+                with metrics.rerun():
+                    refresh_cycle(args.enrich, args.backfill)
+            except Exception as e:
+                # Um ciclo com erro não interrompe o atualizador
+                log(f"ERROR ciclo interrompido: {redact_api_key(str(e))}")
+            if args.once:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        log("Atualizador encerrado")
+    finally:
+        config.flush()
+
+if __name__ == "__main__":
+    main()
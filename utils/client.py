@@ -0,0 +1,124 @@
+"""
+Cliente da API do YouTube para o FlowTube.
+O cliente é criado a partir de um documento de descoberta reduzido, empacotado em
+utils/discovery (apenas os métodos usados pelo app), sem buscar nem interpretar o
+documento completo da API, e só na primeira vez em que um método é chamado.
+Cada requisição pede apenas os campos usados pelo app (respostas parciais com fields=),
+passa pelo limitador de taxa, é repetida com backoff em erros temporários e é bloqueada
+pelo disjuntor quando a cota diária acaba; a compressão gzip e as conexões keep-alive
+vêm do transporte httplib2 de cada thread.
+"""
+
+import os
+import json
+import time
+import threading
+from urllib.parse import urlencode
+
+from utils.metrics import instrumented_request_class
+from utils.ratelimit import (
+    MAX_RETRIES, QuotaExhausted, rate_limiter, quota_breaker, is_quota_error, is_retryable, backoff_delay
+)
+
+# Documento de descoberta reduzido (channels, playlistItems, search e videos .list)
+DISCOVERY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'discovery', 'youtube.v3.json')
+
+# Campos pedidos a cada método (sintaxe de resposta parcial da API); sem as miniaturas
+# que o app não usa nem os campos que o banco não guarda
+THUMBNAIL_FIELDS = "thumbnails(default/url,high/url)"
+FIELD_MASKS = {
+    'youtube.search.list': (
+        f"nextPageToken,items(id/videoId,snippet(publishedAt,channelId,title,description,channelTitle,{THUMBNAIL_FIELDS}))"
+    ),
+    'youtube.playlistItems.list': (
+        "etag,nextPageToken,items("
+        "snippet(channelId,title,description,channelTitle,videoOwnerChannelId,videoOwnerChannelTitle,"
+        f"{THUMBNAIL_FIELDS},resourceId/videoId),"
+        "contentDetails(videoId,videoPublishedAt))"
+    ),
+    'youtube.channels.list': "items(id,snippet/title,contentDetails/relatedPlaylists/uploads)",
+    'youtube.videos.list': "items(id,snippet/liveBroadcastContent,contentDetails/duration,statistics/viewCount)"
+}
+
+def request_class():
+    """Retorna a classe de requisição do cliente: instrumentada nas métricas, com a máscara
+    de campos do método aplicada quando a chamada não define fields e com o controle de
+    taxa, novas tentativas e disjuntor de cota em execute()."""
+    # Importação adiada: o googleapiclient só é carregado quando a API é usada
+    from googleapiclient.errors import HttpError
+
+    base = instrumented_request_class()
+
+    class PartialResponseRequest(base):
+        def __init__(self, http, postproc, uri, method='GET', body=None, headers=None, methodId=None, resumable=None):
+            mask = FIELD_MASKS.get(methodId)
+            if mask and 'fields=' not in uri:
+                uri += ('&' if '?' in uri else '?') + urlencode({'fields': mask})
+            super().__init__(http, postproc, uri, method=method, body=body, headers=headers,
+                             methodId=methodId, resumable=resumable)
+
+        def execute(self, http=None, num_retries=0):
+            # Cota esgotada: falhar sem chamar a API (os vídeos já armazenados continuam no feed)
+            quota_breaker.check()
+            attempt = 0
+            while True:
+                rate_limiter.acquire()
+                try:
+                    return super().execute(http=http)
+                except HttpError as e:
+                    if is_quota_error(e):
+                        quota_breaker.trip()
+                        raise QuotaExhausted(str(e)) from e
+                    if not is_retryable(e) or attempt >= max(num_retries, MAX_RETRIES):
+                        raise
+                    delay = backoff_delay(attempt, e.resp.get('retry-after'))
+                except (ConnectionError, TimeoutError) as e:
+                    # Falhas de rede (conexão recusada ou interrompida, tempo esgotado) também são temporárias
+                    if attempt >= max(num_retries, MAX_RETRIES):
+                        raise
+                    delay = backoff_delay(attempt)
+                attempt += 1
+                time.sleep(delay)
+
+    return PartialResponseRequest
+
+def build_youtube_client(developer_key=None, http=None, api_endpoint=None):
+    """Cria o cliente da API do YouTube a partir do documento de descoberta empacotado.
+    YOUTUBE_API_ENDPOINT (ou api_endpoint) aponta o cliente para outro servidor, como a
+    API sintética dos benchmarks."""
+    # Importação adiada: o googleapiclient só é carregado quando a API é usada
+    from googleapiclient.discovery import build_from_document
+
+    with open(DISCOVERY_PATH, 'r', encoding='utf-8') as f:
+        document = json.load(f)
+    api_endpoint = api_endpoint or os.getenv('YOUTUBE_API_ENDPOINT')
+    return build_from_document(
+        document,
+        developerKey=developer_key or os.getenv('YOUTUBE_API_KEY'),
+        http=http,
+        client_options={'api_endpoint': api_endpoint} if api_endpoint else None,
+        # Cada execute() pede apenas os campos usados e registra latência, cota, tamanho e erros
+        requestBuilder=request_class()
+    )
+
+# Marca de cliente ainda não criado (a fábrica pode retornar None em caso de erro)
+_NOT_CREATED = object()
+
+class LazyClient:
+    """Representa o cliente da API e só o cria no primeiro acesso a um método."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = _NOT_CREATED
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Retorna o cliente, criando-o na primeira chamada (uma única vez, mesmo se a fábrica falhar)."""
+        if self._client is _NOT_CREATED:
+            with self._lock:
+                if self._client is _NOT_CREATED:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
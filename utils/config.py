@@ -0,0 +1,352 @@
+"""
+Configuração do FlowTube.
+Este módulo carrega data/config.json sob demanda (na primeira leitura, não na
+importação), roda as migrações que dependem da API uma única vez em segundo plano,
+agrupa rajadas de alterações em uma só gravação e grava o arquivo de forma atômica
+(arquivo temporário + rename).
+"""
+
+import os
+import copy
+import json
+import atexit
+import tempfile
+import threading
+from collections.abc import MutableMapping
+
+from utils.fetcher import DEFAULT_MAX_WORKERS, DEFAULT_FETCH_BACKEND
+from utils.importer import lookup_channels
+from utils.thumbnails import DEFAULT_CACHE_MB
+from utils.enrichment import DEFAULT_DETAILS_TTL
+from utils.scheduler import DEFAULT_QUOTA_BUDGET
+from utils.ratelimit import DEFAULT_RATE_LIMIT
+from utils.client import build_youtube_client
+from utils.paths import DATA_DIR
+
+# Caminho do arquivo de configuração
+CONFIG_DIR = DATA_DIR
+CONFIG_PATH = os.path.join(CONFIG_DIR, 'config.json')
+
+# Tempo (segundos) para agrupar alterações seguidas em uma só gravação
+SAVE_DELAY = 0.5
+
+# Modos de atualização: o app busca os canais vencidos ("app") ou apenas lê o banco
+# enquanto o atualizador em segundo plano (refresh.py) faz as chamadas à API ("daemon")
+REFRESH_MODE_APP = "app"
+REFRESH_MODE_DAEMON = "daemon"
+DEFAULT_REFRESH_MODE = REFRESH_MODE_APP
+
+# Ordens do feed (a ordenação por relevância fica em utils/ranking.py, que carrega o NumPy só quando usada)
+SORT_DATE = "date"            # Mais recentes primeiro (paginação por chave)
+SORT_RELEVANCE = "relevance"  # BM25 das palavras-chave com decaimento pela idade (paginação por deslocamento)
+DEFAULT_SORT = SORT_DATE
+
+# Intervalo padrão (segundos) entre os ciclos do atualizador em segundo plano
+DEFAULT_REFRESH_INTERVAL = 900
+
+# Configuração padrão
+DEFAULT_CONFIG = {
+    "channels": [],
+    "keywords": [],
+    "channel_ids": {},  # Armazenar IDs de canais
+    "channel_failures": {},  # URLs que não puderam ser resolvidas (horário da falha)
+    "uploads_playlists": {},  # Playlists de uploads por ID de canal
+    "max_results": 5,   # Número padrão de vídeos por canal
+    "language": "pt",   # Idioma padrão
+    "channel_info": [],  # Informações adicionais dos canais (como array)
+    "max_workers": DEFAULT_MAX_WORKERS,  # Número de canais buscados em paralelo
+    "fetch_backend": DEFAULT_FETCH_BACKEND,  # "playlist" (1 unidade de cota), "search" (100 unidades) ou "rss" (sem cota)
+    "thumbnail_cache_mb": DEFAULT_CACHE_MB,  # Tamanho máximo do cache de miniaturas em disco
+    "details_ttl": DEFAULT_DETAILS_TTL,  # Validade (segundos) da duração/visualizações dos vídeos
+    "refresh_mode": DEFAULT_REFRESH_MODE,  # "app" ou "daemon" (a API só é usada pelo refresh.py)
+    "refresh_interval": DEFAULT_REFRESH_INTERVAL,  # Segundos entre os ciclos do refresh.py
+    "hide_watched": False,  # Ocultar do feed os vídeos já assistidos
+    "sort_order": DEFAULT_SORT,  # Ordem do feed: "date" (mais recentes) ou "relevance" (palavras-chave e idade)
+    "daily_quota_budget": DEFAULT_QUOTA_BUDGET,  # Unidades de cota por dia para verificar os canais
+    "api_rate_limit": DEFAULT_RATE_LIMIT,  # Chamadas à API por segundo no processo (0 desativa o limite)
+    "metrics_log": True  # Gravar as métricas (API, miniaturas, fases do rerun) em data/metrics.jsonl
+}
+
+# Marca de chave ausente na combinação das configurações
+_MISSING = object()
+
+def merge_config(local, base, disk):
+    """
+    Combina no lugar (em local) as alterações feitas por outro processo no arquivo.
+
+    Chaves que este processo não alterou desde a última leitura ou gravação (local igual a base)
+    recebem o valor do arquivo; as alteradas aqui são mantidas. Dicionários alterados dos dois
+    lados (ex.: channel_ids) são combinados chave a chave.
+
+    Args:
+        local (dict): Configuração em memória
+        base (dict): Cópia da última leitura ou gravação do arquivo
+        disk (dict): Configuração atual do arquivo
+    """
+    for key in list(dict.fromkeys([*local, *disk])):
+        local_value = local.get(key, _MISSING)
+        base_value = base.get(key, _MISSING)
+        disk_value = disk.get(key, _MISSING)
+        if local_value == base_value:
+            if disk_value is _MISSING:
+                local.pop(key, None)
+            else:
+                local[key] = copy.deepcopy(disk_value)
+        elif isinstance(local_value, dict) and isinstance(disk_value, dict):
+            merge_config(local_value, base_value if isinstance(base_value, dict) else {}, disk_value)
+
+def channel_name_from_url(channel_url):
+    """Extrai um nome amigável do canal a partir da URL."""
+    if '@' in channel_url:
+        # Extrair o nome após o @ e antes de qualquer barra
+        return channel_url.split('@')[-1].split('/')[0]
+    # Usar a URL como fallback
+    return channel_url
+
+class ConfigStore(MutableMapping):
+    """Configuração compartilhada pelo processo, com a interface de um dicionário.
+    O arquivo só é lido no primeiro acesso; save() agenda a gravação e as chamadas
+    feitas dentro de SAVE_DELAY segundos resultam em uma única escrita. O app e o
+    refresh.py gravam o mesmo arquivo: antes de gravar (e em reload()) as alterações
+    do outro processo são combinadas com as locais, em vez de sobrescritas.
+    Alterações em objetos aninhados (ex.: config['channel_info'].append(...)) devem ser
+    feitas com o lock adquirido, para que a gravação não leia um objeto pela metade."""
+
+    def __init__(self, path=CONFIG_PATH, defaults=None, save_delay=SAVE_DELAY):
+        self.path = path
+        self.defaults = defaults if defaults is not None else DEFAULT_CONFIG
+        self.save_delay = save_delay
+        self._data = None
+        self._lock = threading.RLock()
+        self._timer = None
+        self._pending_names = []
+        self._migration_started = False
+        self._mtime = None
+        # Cópia da última leitura ou gravação e indicação de alterações ainda não gravadas
+        self._base = {}
+        self._dirty = False
+
+    @property
+    def lock(self):
+        """Lock que protege a configuração (também adquirido pela gravação)."""
+        return self._lock
+
+    @property
+    def data(self):
+        """Retorna o dicionário da configuração, carregando o arquivo na primeira vez."""
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    self._data = self._load()
+        return self._data
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self.data[key] = value
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self.data[key]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def _file_mtime(self):
+        """Retorna o horário de modificação do arquivo, ou None se ele não existir."""
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self):
+        """Combina as alterações do arquivo se outro processo o alterou desde a última leitura ou
+        gravação. Alterações ainda agendadas são gravadas antes. Retorna True se recarregou."""
+        with self._lock:
+            if self._data is None:
+                self.data
+                return True
+            if self._timer is not None:
+                self.flush()
+            if self._file_mtime() == self._mtime:
+                return False
+            return self._merge_file()
+
+    def _merge_file(self):
+        """Combina na configuração em memória o conteúdo atual do arquivo (chamado com o lock adquirido).
+        Retorna False se o arquivo não pôde ser lido."""
+        mtime = self._file_mtime()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as config_file:
+                disk = json.load(config_file)
+        except (OSError, ValueError):
+            return False
+        for key, value in self.defaults.items():
+            disk.setdefault(key, copy.deepcopy(value))
+        merge_config(self._data, self._base, disk)
+        self._base = disk
+        self._mtime = mtime
+        return True
+
+    def _load(self):
+        """Lê o arquivo, completa os campos ausentes e aplica as migrações locais."""
+        default_config = json.loads(json.dumps(self.defaults))
+
+        # Garantir que o diretório existe
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        try:
+            # Verificar se o arquivo existe e não está vazio
+            if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+                # Criar arquivo de configuração padrão se não existir
+                self._write(default_config)
+                return default_config
+
+            self._mtime = self._file_mtime()
+            with open(self.path, 'r', encoding='utf-8') as config_file:
+                config = json.load(config_file)
+        except Exception as e:
+            # Em caso de erro, usar configuração padrão (o módulo também roda sem o Streamlit, no refresh.py)
+            print(f"Erro ao carregar configuração: {e}")
+
+            # Tentar fazer backup do arquivo corrompido
+            if os.path.exists(self.path):
+                try:
+                    backup_path = f"{self.path}.bak"
+                    os.replace(self.path, backup_path)
+                    print(f"Arquivo de configuração corrompido. Backup criado em {backup_path}")
+                except OSError:
+                    pass
+
+            # Criar novo arquivo de configuração
+            self._write(default_config)
+            return default_config
+
+        # Garantir que todos os campos necessários existam
+        for key, value in default_config.items():
+            if key not in config:
+                config[key] = value
+
+        # Garantir que channel_info seja um array
+        if not isinstance(config['channel_info'], list):
+            config['channel_info'] = []
+
+        # Migrar canais de channels para channel_info se channel_info estiver vazio.
+        # Os nomes extraídos da URL são substituídos pelos reais em segundo plano.
+        if not config['channel_info'] and config.get('channels'):
+            for channel_url in config['channels']:
+                entry = {
+                    'url': channel_url,
+                    'name': channel_name_from_url(channel_url),
+                    'id': config['channel_ids'].get(channel_url)
+                }
+                config['channel_info'].append(entry)
+                if entry['id']:
+                    self._pending_names.append(entry)
+
+            # Salvar a configuração atualizada
+            self._write(config)
+
+        self._base = copy.deepcopy(config)
+        return config
+
+    def start_migrations(self, max_workers=DEFAULT_MAX_WORKERS):
+        """Inicia (uma única vez por processo) as migrações que dependem da API em uma thread de fundo."""
+        self.data
+        with self._lock:
+            if self._migration_started or not self._pending_names:
+                return
+            self._migration_started = True
+            pending = list(self._pending_names)
+        threading.Thread(
+            target=self._migrate_channel_names, args=(pending, max_workers),
+            name="flowtube-config-migration", daemon=True
+        ).start()
+
+    def _migrate_channel_names(self, entries, max_workers):
+        """Busca os nomes reais dos canais migrados, em lotes de 50 IDs consultados em paralelo."""
+        if not os.getenv('YOUTUBE_API_KEY'):
+            return
+        try:
+            youtube = build_youtube_client()
+        except Exception as e:
+            print(f"Erro ao migrar nomes dos canais: {e}")
+            return
+
+        # Se um lote falhar, os seus canais continuam com o nome extraído da URL
+        channels, _, _ = lookup_channels(youtube, [entry['id'] for entry in entries], max_workers)
+        titles = {channel_id: info['title'] for channel_id, info in channels.items() if info['title']}
+
+        with self._lock:
+            for entry in entries:
+                if entry['id'] in titles:
+                    entry['name'] = titles[entry['id']]
+            self._pending_names = []
+        if titles:
+            self.save()
+
+    def save(self):
+        """Agenda a gravação; alterações seguidas dentro de save_delay geram uma só escrita."""
+        with self._lock:
+            self._dirty = True
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.save_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Grava imediatamente as alterações pendentes (sem alterações, o arquivo não é gravado)."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._data is None or not self._dirty:
+                return
+            # Outro processo gravou o arquivo depois da última leitura: combinar antes de gravar
+            if self._file_mtime() != self._mtime:
+                self._merge_file()
+            self._write(self._data)
+
+    def _write(self, data):
+        """Grava o arquivo de forma atômica: arquivo temporário no mesmo diretório + rename."""
+        # Cópia serializada com o lock que todas as alterações adquirem; a escrita em disco fica fora dele
+        with self._lock:
+            content = json.dumps(data, ensure_ascii=False, indent=4)
+            base = json.loads(content)
+        directory = os.path.dirname(self.path)
+        fd, tmp_path = tempfile.mkstemp(prefix='.config.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+                tmp_file.write(content)
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+            os.replace(tmp_path, self.path)
+            self._mtime = self._file_mtime()
+            self._base = base
+            self._dirty = False
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+_config = None
+_config_lock = threading.Lock()
+
+def get_config():
+    """Retorna a configuração compartilhada pelo processo (o arquivo só é lido no primeiro acesso)."""
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                _config = ConfigStore()
+                # Não perder alterações ainda agendadas quando o processo terminar
+                atexit.register(_config.flush)
+    return _config
@@ -0,0 +1,105 @@
+"""
+Enriquecimento de vídeos do FlowTube.
+Este módulo busca duração, visualizações e status de live/short dos vídeos com
+chamadas de videos().list agrupadas em lotes de 50 IDs, guardando os resultados
+no banco local com validade, para só pedir de novo os IDs vencidos ou ausentes.
+"""
+
+import re
+import time
+
+from utils.fetcher import get_thread_http
+from utils.ratelimit import QuotaExhausted
+from utils.metrics import redact_api_key
+
+# Limite de IDs por chamada de videos().list
+VIDEOS_BATCH_SIZE = 50
+
+# Validade padrão dos detalhes de um vídeo (6 horas)
+DEFAULT_DETAILS_TTL = 6 * 3600
+
+# Duração máxima (segundos) para um vídeo ser considerado short. A API não informa se um vídeo
+# é short: a marcação é uma estimativa pela duração (shorts podem ter até 3 minutos desde 2024),
+# e vídeos comuns curtos também são marcados
+SHORT_MAX_SECONDS = 180
+
+_DURATION_RE = re.compile(
+    r"P(?:(?P<days>\d+)D)?(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?"
+)
+
+def parse_duration(value):
+    """Converte uma duração ISO 8601 (ex.: PT1H2M3S) em segundos, ou None se inválida."""
+    match = _DURATION_RE.fullmatch(value or '')
+    if not match:
+        return None
+    parts = {name: int(number) for name, number in match.groupdict(default='0').items()}
+    return parts['days'] * 86400 + parts['hours'] * 3600 + parts['minutes'] * 60 + parts['seconds']
+
+def format_duration(seconds):
+    """Formata a duração em segundos como H:MM:SS ou M:SS."""
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+def item_to_details(item):
+    """Converte um item de videos().list nos detalhes guardados no banco."""
+    snippet = item.get('snippet', {})
+    statistics = item.get('statistics', {})
+    duration = parse_duration(item.get('contentDetails', {}).get('duration'))
+    live_status = snippet.get('liveBroadcastContent', 'none')
+    view_count = statistics.get('viewCount')
+    return {
+        'video_id': item['id'],
+        'duration': duration,
+        'view_count': int(view_count) if view_count is not None else None,
+        'live_status': live_status,
+        'is_short': bool(duration) and duration <= SHORT_MAX_SECONDS and live_status == 'none'
+    }
+
+def request_video_details(youtube, video_ids, http=None):
+    """Busca os detalhes de até 50 vídeos em uma única chamada de videos().list (1 unidade de cota)."""
+    request = youtube.videos().list(
+        part="snippet,contentDetails,statistics",
+        id=",".join(video_ids),
+        maxResults=VIDEOS_BATCH_SIZE
+    )
+    response = request.execute(http=http)
+    return [item_to_details(item) for item in response.get('items', [])]
+
+def enrich_videos(youtube, store, video_ids, ttl=DEFAULT_DETAILS_TTL):
+    """
+    Garante detalhes atualizados para os vídeos, consultando a API só para os vencidos ou ausentes.
+
+    Args:
+        youtube: Cliente da API do YouTube
+        store: Banco local de vídeos (VideoStore)
+        video_ids (list): IDs dos vídeos a enriquecer
+        ttl (int): Validade dos detalhes em segundos
+
+    Returns:
+        int: Número de vídeos cujos detalhes foram buscados e gravados
+    """
+    video_ids = list(dict.fromkeys(video_id for video_id in video_ids if video_id))
+    stale_ids = store.stale_details(video_ids, ttl, now=time.time())
+    saved = 0
+
+    for start in range(0, len(stale_ids), VIDEOS_BATCH_SIZE):
+        batch = stale_ids[start:start + VIDEOS_BATCH_SIZE]
+        try:
+            details = request_video_details(youtube, batch, http=get_thread_http())
+            # Vídeos removidos ou privados também são guardados, para não serem pedidos de novo
+            returned = {entry['video_id'] for entry in details}
+            details.extend(
+                {'video_id': video_id, 'duration': None, 'view_count': None, 'live_status': None, 'is_short': False}
+                for video_id in batch if video_id not in returned
+            )
+            store.save_details(details)
+            saved += len(details)
+        except QuotaExhausted:
+            # Cota diária esgotada: os demais lotes também falhariam
+            break
+        except Exception as e:
+            # Sem detalhes o card continua sendo exibido, apenas sem os metadados extras
+            print(f"Erro ao buscar detalhes dos vídeos: {redact_api_key(str(e))}")
+
+    return saved
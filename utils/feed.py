@@ -0,0 +1,458 @@
+"""
+Pipeline do feed do FlowTube.
+Este módulo reúne a resolução dos canais, a busca dos vídeos e a atualização do banco
+local, sem depender do Streamlit, para ser usado tanto pelo app (main.py) quanto pelo
+atualizador em segundo plano (refresh.py). Os avisos e erros são entregues a um
+relator configurável: o app os exibe na página, o atualizador os escreve no log.
+"""
+
+import threading
+from datetime import datetime
+
+from utils.fetcher import (
+    DEFAULT_MAX_WORKERS, DEFAULT_FETCH_BACKEND, FETCH_BACKEND_SEARCH, FETCH_BACKEND_PLAYLIST, FETCH_BACKEND_RSS,
+    ChannelFlights, fetch_channels_parallel, wait_for_flights,
+    resolve_uploads_playlists, request_playlist_videos, request_playlist_page, iter_playlist_pages
+)
+from utils.matcher import compile_keywords, video_text
+from utils.store import VideoStore
+from utils.rss import FEED_SIZE, request_feed_videos
+from utils.importer import lookup_channels
+from utils.resolver import FAILURE_INVALID_URL, FAILURE_NOT_FOUND, resolve_channels
+from utils.client import LazyClient, build_youtube_client
+from utils.ratelimit import DEFAULT_RATE_LIMIT, QuotaExhausted, rate_limiter, quota_breaker
+from utils.metrics import metrics, redact_api_key
+from utils.scheduler import (
+    INCREMENTAL_PAGE_SIZE, DEFAULT_QUOTA_BUDGET, POLL_COSTS, quota_day, update_schedules, select_within_budget,
+    skip_failed_channels
+)
+from utils.config import get_config
+
+# Configuração compartilhada pelo processo
+config = get_config()
+
+# Canais verificados há menos que isso (segundos) não são verificados de novo por Atualizar
+FORCE_REFRESH_WINDOW = 60
+
+# Canais sendo buscados agora por alguma sessão do processo
+_flights = ChannelFlights()
+
+def print_reporter(level, key, *args):
+    """Relator padrão: escreve a mensagem na saída padrão."""
+    print(f"[{level}] {key}: {' '.join(str(arg) for arg in args)}")
+
+_reporter = print_reporter
+
+def set_reporter(reporter):
+    """Define a função que recebe os avisos e erros: reporter(nível, chave de tradução, *args)."""
+    global _reporter
+    _reporter = reporter or print_reporter
+
+def report(level, key, *args):
+    """Entrega um aviso ("warning") ou erro ("error") ao relator atual e o registra nas métricas.
+    Mensagens de erro da API trazem a URL da requisição: a chave da API é ocultada antes."""
+    args = [redact_api_key(str(arg)) for arg in args]
+    metrics.record_error(key, *args)
+    _reporter(level, key, *args)
+
+# Função para criar o cliente da API (o erro é reportado e o feed em cache continua disponível)
+def create_youtube_client():
+    # Chamadas por segundo do processo inteiro (0 desativa o limite)
+    rate_limiter.configure(config.get('api_rate_limit', DEFAULT_RATE_LIMIT))
+    try:
+        return build_youtube_client()
+    except Exception as e:
+        report('error', 'error_occurred', e)
+        return None
+
+# Cliente da API criado só no primeiro uso, compartilhado pelo processo
+youtube = LazyClient(create_youtube_client)
+
+_store = None
+_store_lock = threading.Lock()
+
+# Banco local de vídeos (também é o cache de feed por canal), compartilhado pelo processo
+def get_video_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = VideoStore()
+    return _store
+
+# Função para somar ao gasto de cota do dia o custo de cada requisição executada (inclusive
+# novas tentativas, páginas seguintes, resolução de handles e playlists e enriquecimento)
+def charge_quota(units):
+    get_video_store().add_quota(quota_day(), units)
+
+metrics.set_quota_listener(charge_quota)
+
+_relevance_index = None
+
+# Índice de relevância dos vídeos do banco (ordenação do feed por relevância), compartilhado pelo processo
+def get_relevance_index():
+    global _relevance_index
+    if _relevance_index is None:
+        store = get_video_store()
+        with _store_lock:
+            if _relevance_index is None:
+                # Importação adiada: o NumPy só é carregado quando o feed é ordenado por relevância
+                from utils.ranking import RelevanceIndex
+                _relevance_index = RelevanceIndex(store)
+    return _relevance_index
+
+# Função para obter ID do canal a partir da URL
+def get_channel_id(channel_url, retry_failed=False):
+    # Verificar se o ID já está em cache
+    if channel_url in config['channel_ids']:
+        return config['channel_ids'][channel_url]
+
+    resolve_pending_channels([channel_url], retry_failed=retry_failed)
+    return config['channel_ids'].get(channel_url)
+
+# Função para resolver em lote as URLs de canais que ainda não têm ID (salva o config uma vez por lote)
+def resolve_pending_channels(channel_urls, retry_failed=False):
+    pending = [channel_url for channel_url in channel_urls if channel_url not in config['channel_ids']]
+    if not pending:
+        return {}
+
+    titles, failed, changed = resolve_channels(
+        youtube, pending, config['channel_ids'], config['channel_failures'],
+        max_workers=config.get('max_workers', DEFAULT_MAX_WORKERS),
+        retry_failed=retry_failed, lock=config.lock
+    )
+    if changed:
+        config.save()
+
+    for channel_url, reason in failed.items():
+        if reason == FAILURE_INVALID_URL:
+            report('error', 'invalid_url', channel_url)
+        elif reason == FAILURE_NOT_FOUND:
+            report('error', 'error_channel_id', channel_url)
+        elif isinstance(reason, QuotaExhausted):
+            # A URL fica pendente e é resolvida depois da renovação da cota
+            continue
+        else:
+            report('error', 'error_occurred', reason)
+    return titles
+
+# Função para informar o horário em que a cota diária é renovada (horário local)
+def quota_reset_time():
+    return f"{datetime.fromtimestamp(quota_breaker.open_until):%H:%M}"
+
+# Função para reportar as falhas dos canais; a cota esgotada é reportada uma única vez
+# (os canais continuam com os vídeos já armazenados)
+def report_channel_errors(errors, channel_urls):
+    quota_exhausted = False
+    for channel_id, error in errors.items():
+        if isinstance(error, QuotaExhausted):
+            quota_exhausted = True
+        else:
+            report('warning', 'channel_fetch_failed', channel_urls[channel_id], error)
+    if quota_exhausted:
+        report('warning', 'quota_exhausted', quota_reset_time())
+
+# Função para importar inscrições em lote (Takeout/OPML): confirma os canais e os nomes com channels().list
+# em lotes de 50 IDs consultados em paralelo e salva a configuração uma única vez no final
+# (retorna o número de canais adicionados, dos que já estavam configurados e dos não encontrados)
+def import_subscriptions(entries, progress=None):
+    known_ids = {info.get('id') or config['channel_ids'].get(info['url']) for info in config['channel_info']}
+    new_entries = [entry for entry in entries if entry['id'] not in known_ids]
+    channels, errors, failed_ids = lookup_channels(
+        youtube, [entry['id'] for entry in new_entries],
+        max_workers=config.get('max_workers', DEFAULT_MAX_WORKERS), progress=progress
+    ) if new_entries else ({}, [], set())
+    for error in errors:
+        report('error', 'error_occurred', error)
+
+    added = []
+    not_found = []
+    for entry in new_entries:
+        info = channels.get(entry['id'])
+        # Sem resposta da API (lote com falha), o canal é importado com o nome do arquivo;
+        # ausente de um lote respondido, o canal não existe
+        if info is None and entry['id'] not in failed_ids:
+            not_found.append(entry)
+            continue
+        with config.lock:
+            config['channel_info'].append({
+                'url': entry['url'],
+                'name': (info or {}).get('title') or entry['name'] or entry['url'],
+                'id': entry['id']
+            })
+            config['channel_ids'][entry['url']] = entry['id']
+            config['channel_failures'].pop(entry['url'], None)
+            if info and info['uploads']:
+                config['uploads_playlists'][entry['id']] = info['uploads']
+        added.append(entry)
+
+    for entry in not_found:
+        report('warning', 'import_not_found', entry['name'] or entry['url'])
+    if added:
+        with config.lock:
+            config['channels'] = [c['url'] for c in config['channel_info']]
+        config.save()
+    return len(added), len(entries) - len(new_entries), len(not_found)
+
+# Função para requisitar os vídeos mais recentes de um canal (propaga exceções)
+def request_latest_videos(channel_id, max_results=10, http=None, backend=None, published_after=None):
+    backend = backend or config.get('fetch_backend', DEFAULT_FETCH_BACKEND)
+
+    # Feed RSS do canal (sem cota), quando tem vídeos suficientes
+    if backend == FETCH_BACKEND_RSS and max_results <= FEED_SIZE:
+        videos, _ = request_feed_videos(channel_id, max_results)
+        return [video for video in videos if not published_after or video['snippet']['publishedAt'] > published_after]
+
+    # Backend padrão: playlist de uploads (1 unidade de cota em vez de 100)
+    if backend != FETCH_BACKEND_SEARCH:
+        playlist_id = config['uploads_playlists'].get(channel_id)
+        if playlist_id:
+            return request_playlist_videos(youtube, playlist_id, max_results, http=http)
+
+    request = youtube.search().list(
+        part="snippet",
+        channelId=channel_id,
+        order="date",
+        type="video",
+        maxResults=max_results,
+        publishedAfter=published_after
+    )
+    response = request.execute(http=http)
+    return response.get('items', [])
+
+# Função para atualizar um canal no cache de feed buscando apenas os vídeos novos (propaga exceções)
+def refresh_channel_videos(channel_id, max_results=10, http=None, backend=None, store=None):
+    backend = backend or config.get('fetch_backend', DEFAULT_FETCH_BACKEND)
+    store = store if store is not None else get_video_store()
+
+    # Feed RSS (sem cota): a API só é usada para o backfill de mais vídeos do que o feed contém
+    if backend == FETCH_BACKEND_RSS and not needs_feed_backfill(store, channel_id, max_results):
+        return refresh_channel_from_feed(channel_id, max_results, store)
+
+    playlist_id = config['uploads_playlists'].get(channel_id) if backend != FETCH_BACKEND_SEARCH else None
+
+    # Primeira busca do canal (ou mais vídeos pedidos do que os armazenados): busca completa
+    if store.needs_full_fetch(channel_id, max_results):
+        if playlist_id:
+            videos, etag = request_playlist_page(youtube, playlist_id, max_results, http=http)
+            # O ETag só vale para requisições com o mesmo tamanho de página
+            etag = etag if max_results <= INCREMENTAL_PAGE_SIZE else None
+        else:
+            videos, etag = request_latest_videos(channel_id, max_results, http=http, backend=backend), None
+        store.replace(channel_id, videos, max_results, etag)
+        return len(videos)
+
+    newest = store.newest_published(channel_id)
+
+    # Busca por pesquisa: pedir apenas vídeos publicados depois do mais recente conhecido
+    if not playlist_id:
+        videos = request_latest_videos(channel_id, max_results, http=http, backend=backend, published_after=newest)
+        return store.merge(channel_id, videos)
+
+    # Busca por playlist: requisição condicional (If-None-Match) de uma página pequena,
+    # do tamanho agendado para o ritmo de publicação do canal
+    page_size = min(max_results, store.get(channel_id)['page_size'] or INCREMENTAL_PAGE_SIZE)
+    videos, etag = request_playlist_page(youtube, playlist_id, page_size, http=http, etag=store.etag(channel_id))
+    if videos is None:
+        store.touch(channel_id)
+        return 0
+
+    new_videos = [video for video in videos if newest is None or video['snippet']['publishedAt'] > newest]
+    if len(new_videos) == page_size and page_size < max_results:
+        # Todos os vídeos da página são novos; buscar a página completa
+        videos, _ = request_playlist_page(youtube, playlist_id, max_results, http=http)
+        new_videos = [video for video in videos if newest is None or video['snippet']['publishedAt'] > newest]
+    return store.merge(channel_id, new_videos, etag)
+
+# Função para indicar se o canal precisa de uma busca pela API antes de ser atualizado pelo feed RSS
+def needs_feed_backfill(store, channel_id, max_results):
+    return max_results > FEED_SIZE and store.needs_full_fetch(channel_id, max_results)
+
+# Função para atualizar um canal no cache de feed pelo feed RSS (propaga exceções)
+def refresh_channel_from_feed(channel_id, max_results, store):
+    full_fetch = store.needs_full_fetch(channel_id, max_results)
+    videos, etag = request_feed_videos(channel_id, max_results, etag=None if full_fetch else store.etag(channel_id))
+    if videos is None:
+        store.touch(channel_id)
+        return 0
+    if full_fetch:
+        store.replace(channel_id, videos, max_results, etag)
+        return len(videos)
+    newest = store.newest_published(channel_id)
+    return store.merge(channel_id, [video for video in videos if newest is None or video['snippet']['publishedAt'] > newest], etag)
+
+# Função para filtrar conteúdo relevante (o buscador é compilado uma vez por conjunto de palavras-chave)
+def filter_relevant_content(videos, keywords):
+    matcher = compile_keywords(tuple(keywords))
+    return [video for video in videos if matcher.search(video_text(video))]
+
+# Atualizar no banco local os canais vencidos (cada canal é verificado conforme a sua agenda)
+def sync_channels(channels, max_results=5, max_workers=DEFAULT_MAX_WORKERS, backend=DEFAULT_FETCH_BACKEND, force_refresh=False):
+    channel_ids, channel_urls = resolve_channel_ids(channels)
+    refresh_stale_channels(channel_ids, channel_urls, max_results, max_workers, backend, force_refresh)
+    return channel_ids
+
+# Função para obter os IDs dos canais configurados (sem repetição) e a URL de cada ID
+def resolve_channel_ids(channels, resolve=True):
+    # Resolver em lote as URLs pendentes (sem resolve, usa apenas os IDs já em cache)
+    if resolve:
+        resolve_pending_channels(channels)
+    channel_ids = []
+    channel_urls = {}
+    for channel in channels:
+        channel_id = get_channel_id(channel) if resolve else config['channel_ids'].get(channel)
+        if channel_id:
+            if channel_id not in channel_urls:
+                channel_ids.append(channel_id)
+                channel_urls[channel_id] = channel
+        elif resolve:
+            report('warning', 'skipping_channel', channel)
+    return channel_ids, channel_urls
+
+# Função para atualizar no banco local os canais vencidos (retorna os vídeos novos e as falhas por canal).
+# Cada canal é buscado no máximo uma vez por vez no processo: os canais que outra sessão já está
+# buscando não são pedidos de novo, apenas aguardados, e o resultado é lido do banco compartilhado.
+def refresh_stale_channels(channel_ids, channel_urls, max_results=5, max_workers=DEFAULT_MAX_WORKERS, backend=DEFAULT_FETCH_BACKEND, force_refresh=False, only_new=False):
+    store = get_video_store()
+
+    # Atualizar (forçado) apenas verifica os canais de novo, sem descartar os vídeos armazenados;
+    # canais recém-verificados (ex.: por outra aba) não são verificados outra vez
+    if force_refresh:
+        store.expire(channel_ids, min_age=FORCE_REFRESH_WINDOW)
+    stale_ids = [channel_id for channel_id in channel_ids if not store.is_fresh(channel_id, max_results)]
+
+    # Canais que falharam há pouco esperam um intervalo que dobra a cada falha seguida, em vez de
+    # serem consultados (e de gastarem cota) a cada rerun
+    stale_ids = skip_failed_channels(store, stale_ids)
+
+    # Apenas canais que ainda não têm nada no banco (os demais podem esperar o feed ser exibido)
+    if only_new:
+        stale_ids = [channel_id for channel_id in stale_ids if store.get(channel_id) is None]
+
+    claimed, pending = _flights.claim(stale_ids)
+    try:
+        results, errors = _refresh_claimed_channels(store, claimed, channel_urls, max_results, max_workers, backend)
+    finally:
+        _flights.release(claimed)
+
+    # Canais buscados por outra sessão: esperar a busca terminar (o resultado já estará no banco)
+    if pending:
+        wait_for_flights(pending)
+    return results, errors
+
+def _refresh_claimed_channels(store, channel_ids, channel_urls, max_results, max_workers, backend):
+    """Busca os canais reservados por esta chamada que ainda estão vencidos."""
+    # Um canal pode ter sido atualizado por outra sessão entre a verificação e a reserva
+    stale_ids = [channel_id for channel_id in channel_ids if not store.is_fresh(channel_id, max_results)]
+
+    # Verificar apenas os canais que cabem no orçamento diário de cota (os demais ficam para depois)
+    cost = POLL_COSTS.get(backend, POLL_COSTS[DEFAULT_FETCH_BACKEND])
+    stale_ids, _ = select_within_budget(store, stale_ids, cost, config.get('daily_quota_budget', DEFAULT_QUOTA_BUDGET))
+
+    if not stale_ids:
+        return {}, {}
+
+    # No backend RSS, apenas o backfill de mais vídeos do que o feed contém usa a API
+    if backend == FETCH_BACKEND_RSS:
+        api_ids = [channel_id for channel_id in stale_ids if needs_feed_backfill(store, channel_id, max_results)]
+    else:
+        api_ids = stale_ids
+
+    # Cota diária esgotada: os canais que dependem da API ficam com os vídeos armazenados até a renovação
+    if api_ids and quota_breaker.is_open():
+        api_ids = set(api_ids)
+        stale_ids = [channel_id for channel_id in stale_ids if channel_id not in api_ids]
+        api_ids = []
+        if not stale_ids:
+            return {}, {}
+
+    if api_ids:
+        # Criar o cliente na thread principal, antes dos workers
+        youtube.get()
+
+        # Resolver as playlists de uploads que ainda não estão no cache (uma vez por canal)
+        if backend != FETCH_BACKEND_SEARCH:
+            if resolve_uploads_playlists(youtube, api_ids, config['uploads_playlists'], lock=config.lock):
+                config.save()
+
+    # Atualizar os canais em paralelo; cada worker usa o seu próprio transporte HTTP
+    results, errors = fetch_channels_parallel(
+        stale_ids,
+        lambda channel_id, http: refresh_channel_videos(channel_id, max_results, http=http, backend=backend, store=store),
+        max_workers=max_workers
+    )
+
+    # Reagendar os canais atualizados conforme o ritmo de publicação observado
+    update_schedules(store, list(results), max_results)
+
+    # Guardar as falhas para marcar os canais desatualizados na interface (também no modo daemon)
+    store.save_channel_errors(
+        {channel_id: redact_api_key(str(error)) for channel_id, error in errors.items()}, list(results)
+    )
+
+    # Canal com falha é reportado e mantém os vídeos armazenados, sem interromper os demais
+    report_channel_errors(errors, channel_urls)
+    return results, errors
+
+# Função para percorrer o histórico completo de um canal pela playlist de uploads, a partir de um
+# checkpoint (gerador: cada página de até 50 vídeos só é pedida quando a anterior foi consumida)
+def iter_channel_history(channel_id, page_token=None, http=None):
+    playlist_id = config['uploads_playlists'].get(channel_id) or 'UU' + channel_id[2:]
+    yield from iter_playlist_pages(youtube, playlist_id, page_token, http=http)
+
+# Função para importar o histórico de um canal para o banco, página por página, retomando do último
+# checkpoint (propaga exceções). Para ao fim do histórico, após max_pages páginas ou ao atingir o orçamento de cota.
+def backfill_channel(channel_id, max_pages=None, http=None, store=None, budget=None):
+    store = store if store is not None else get_video_store()
+    state = store.backfill_state(channel_id)
+    if state and state['completed_at']:
+        return 0
+
+    def within_budget():
+        return budget is None or store.quota_used(quota_day()) + POLL_COSTS[FETCH_BACKEND_PLAYLIST] <= budget
+
+    if not within_budget():
+        return 0
+
+    page_token = state['page_token'] if state else None
+    added = 0
+    pages = 0
+    try:
+        for videos, next_page_token in iter_channel_history(channel_id, page_token, http=http):
+            # Vídeos e checkpoint gravados juntos: uma interrupção retoma a partir da próxima página
+            added += store.save_backfill_page(channel_id, videos, next_page_token)
+            pages += 1
+            if (max_pages and pages >= max_pages) or not within_budget():
+                break
+    except Exception as e:
+        # Um token de página expirado ou inválido (400) faz o próximo backfill recomeçar do início
+        if page_token and pages == 0 and getattr(getattr(e, 'resp', None), 'status', None) == 400:
+            store.reset_backfill([channel_id])
+        raise
+    return added
+
+# Função para importar o histórico dos canais em paralelo (retorna os vídeos importados e as falhas por canal)
+def backfill_channels(channel_ids, channel_urls, max_pages=None, max_workers=DEFAULT_MAX_WORKERS):
+    store = get_video_store()
+    pending = [channel_id for channel_id in channel_ids if not (store.backfill_state(channel_id) or {}).get('completed_at')]
+    if not pending or quota_breaker.is_open():
+        return {}, {}
+
+    # Criar o cliente na thread principal e resolver as playlists de uploads, antes dos workers
+    youtube.get()
+    if resolve_uploads_playlists(youtube, pending, config['uploads_playlists'], lock=config.lock):
+        config.save()
+
+    budget = config.get('daily_quota_budget', DEFAULT_QUOTA_BUDGET)
+    results, errors = fetch_channels_parallel(
+        pending,
+        lambda channel_id, http: backfill_channel(channel_id, max_pages, http=http, store=store, budget=budget),
+        max_workers=max_workers
+    )
+    report_channel_errors(errors, channel_urls)
+    return results, errors
+
+# Todos os vídeos do feed, já filtrados e ordenados pelo banco local
+def get_cached_videos(channels, max_results=5, keywords=None, max_workers=DEFAULT_MAX_WORKERS, backend=DEFAULT_FETCH_BACKEND, force_refresh=False):
+    channel_ids = sync_channels(channels, max_results, max_workers, backend, force_refresh)
+    return get_video_store().feed_page(channel_ids, keywords)
@@ -0,0 +1,271 @@
+"""
+Busca paralela de vídeos para o FlowTube.
+Este módulo distribui a busca dos canais entre um pool limitado de threads,
+cada uma com o seu próprio transporte HTTP, e implementa o backend de busca
+pelas playlists de uploads (1 unidade de cota por canal em vez de 100).
+"""
+
+import time
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.metrics import redact_api_key
+
+# Número padrão de canais buscados ao mesmo tempo
+DEFAULT_MAX_WORKERS = 8
+
+# Armazenamento por thread para o transporte HTTP
+_thread_local = threading.local()
+
+def get_thread_http():
+    """Retorna o transporte HTTP exclusivo da thread atual.
+    O httplib2 usado pelo cliente da API não é thread-safe, então cada
+    worker cria (uma única vez) a sua própria conexão."""
+    http = getattr(_thread_local, 'http', None)
+    if http is None:
+        # Importação adiada: o googleapiclient só é carregado quando a API é usada
+        import googleapiclient.http
+        http = googleapiclient.http.build_http()
+        _thread_local.http = http
+    return http
+
+def fetch_channels_parallel(channel_ids, fetch_channel, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Busca vários canais em paralelo com um número limitado de workers.
+
+    Args:
+        channel_ids (list): IDs dos canais a buscar
+        fetch_channel (callable): Função que recebe (channel_id, http) e retorna a lista de vídeos
+        max_workers (int): Número máximo de canais buscados ao mesmo tempo
+
+    Returns:
+        tuple: (dict channel_id -> vídeos, dict channel_id -> exceção) para os canais com sucesso e com falha
+    """
+    results = {}
+    errors = {}
+
+    if not channel_ids:
+        return results, errors
+
+    workers = max(1, min(int(max_workers or DEFAULT_MAX_WORKERS), len(channel_ids)))
+
+    def run(channel_id):
+        return fetch_channel(channel_id, get_thread_http())
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="flowtube-fetch") as executor:
+        futures = {executor.submit(run, channel_id): channel_id for channel_id in channel_ids}
+        for future in as_completed(futures):
+            channel_id = futures[future]
+            try:
+                results[channel_id] = future.result()
+            except Exception as e:
+                # Um canal com falha não interrompe os demais
+                errors[channel_id] = e
+
+    return results, errors
+
+# Tempo máximo (segundos) de espera por um canal sendo buscado por outra sessão
+FLIGHT_WAIT_TIMEOUT = 60
+
+class ChannelFlights:
+    """Registro dos canais sendo buscados no processo (single-flight).
+    Quando várias sessões pedem o mesmo canal ao mesmo tempo, apenas a primeira
+    o busca; as demais esperam essa busca terminar e leem o resultado do banco."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = {}
+
+    def claim(self, channel_ids):
+        """
+        Reserva os canais que ninguém está buscando.
+
+        Returns:
+            tuple: (IDs reservados pela chamada, dict channel_id -> evento dos canais já em busca)
+        """
+        claimed = []
+        pending = {}
+        with self._lock:
+            for channel_id in channel_ids:
+                event = self._events.get(channel_id)
+                if event is None:
+                    self._events[channel_id] = threading.Event()
+                    claimed.append(channel_id)
+                else:
+                    pending[channel_id] = event
+        return claimed, pending
+
+    def release(self, channel_ids):
+        """Libera os canais reservados e acorda quem espera por eles."""
+        with self._lock:
+            events = [self._events.pop(channel_id, None) for channel_id in channel_ids]
+        for event in events:
+            if event is not None:
+                event.set()
+
+def wait_for_flights(pending, timeout=FLIGHT_WAIT_TIMEOUT):
+    """Espera as buscas de outras sessões terminarem (até timeout segundos no total).
+    Retorna os IDs cuja busca ainda não terminou."""
+    deadline = time.monotonic() + timeout
+    return [
+        channel_id for channel_id, event in pending.items()
+        if not event.wait(max(0, deadline - time.monotonic()))
+    ]
+
+# Backends de busca disponíveis
+FETCH_BACKEND_SEARCH = "search"      # search().list - 100 unidades de cota por chamada
+FETCH_BACKEND_PLAYLIST = "playlist"  # playlistItems().list - 1 unidade de cota por chamada
+FETCH_BACKEND_RSS = "rss"            # feed RSS público do canal - sem cota (até 15 vídeos)
+DEFAULT_FETCH_BACKEND = FETCH_BACKEND_PLAYLIST
+
+# Limite de IDs por chamada de channels().list
+CHANNELS_BATCH_SIZE = 50
+
+def resolve_uploads_playlists(youtube, channel_ids, cache, lock=None):
+    """
+    Resolve a playlist de uploads de cada canal, consultando a API apenas para os que
+    ainda não estão no cache. As consultas são agrupadas em lotes de 50 IDs (1 unidade cada).
+
+    Args:
+        youtube: Cliente da API do YouTube
+        channel_ids (list): IDs dos canais
+        cache (dict): Cache channel_id -> playlist de uploads (normalmente config['uploads_playlists'])
+        lock: Lock adquirido ao alterar o cache (ex.: config.lock); as consultas à API ficam fora dele
+
+    Returns:
+        bool: True se o cache foi alterado e precisa ser salvo
+    """
+    pending = [channel_id for channel_id in dict.fromkeys(channel_ids) if channel_id not in cache]
+    changed = False
+    lock = lock if lock is not None else nullcontext()
+
+    for start in range(0, len(pending), CHANNELS_BATCH_SIZE):
+        batch = pending[start:start + CHANNELS_BATCH_SIZE]
+        resolved = {}
+        try:
+            response = youtube.channels().list(
+                part="contentDetails",
+                id=",".join(batch),
+                maxResults=CHANNELS_BATCH_SIZE
+            ).execute(http=get_thread_http())
+            for item in response.get('items', []):
+                uploads = item.get('contentDetails', {}).get('relatedPlaylists', {}).get('uploads')
+                if uploads:
+                    resolved[item['id']] = uploads
+        except Exception as e:
+            print(f"Erro ao resolver playlists de uploads: {redact_api_key(str(e))}")
+
+        # A playlist de uploads segue a convenção UC... -> UU...; usar como alternativa
+        for channel_id in batch:
+            if channel_id not in resolved and channel_id.startswith('UC'):
+                resolved[channel_id] = 'UU' + channel_id[2:]
+
+        if resolved:
+            with lock:
+                cache.update(resolved)
+            changed = True
+
+    return changed
+
+def playlist_item_to_video(item):
+    """Converte um item de playlistItems().list para o formato de item de search().list,
+    que é o formato usado na ordenação, no filtro e na renderização.
+    Retorna None para vídeos privados ou removidos."""
+    snippet = item.get('snippet', {})
+    content_details = item.get('contentDetails', {})
+    video_id = content_details.get('videoId') or snippet.get('resourceId', {}).get('videoId')
+    published_at = content_details.get('videoPublishedAt')
+
+    # Vídeos privados/removidos não têm data de publicação
+    if not video_id or not published_at:
+        return None
+
+    return {
+        'kind': 'youtube#searchResult',
+        'id': {
+            'kind': 'youtube#video',
+            'videoId': video_id
+        },
+        'snippet': {
+            'publishedAt': published_at,
+            'channelId': snippet.get('videoOwnerChannelId') or snippet.get('channelId'),
+            'title': snippet.get('title', ''),
+            'description': snippet.get('description', ''),
+            'thumbnails': snippet.get('thumbnails', {}),
+            'channelTitle': snippet.get('videoOwnerChannelTitle') or snippet.get('channelTitle', '')
+        }
+    }
+
+def request_playlist_page(youtube, playlist_id, max_results=10, http=None, etag=None):
+    """
+    Busca a primeira página de uma playlist de uploads no formato de search().list.
+
+    Args:
+        youtube: Cliente da API do YouTube
+        playlist_id (str): ID da playlist de uploads
+        max_results (int): Número de vídeos pedidos
+        http: Transporte HTTP a usar (um por thread)
+        etag (str): ETag da resposta anterior, enviado em If-None-Match
+
+    Returns:
+        tuple: (vídeos, etag); vídeos é None quando a playlist não mudou (resposta 304)
+    """
+    request = youtube.playlistItems().list(
+        part="snippet,contentDetails",
+        playlistId=playlist_id,
+        maxResults=max_results
+    )
+    if etag:
+        request.headers['If-None-Match'] = etag
+    import googleapiclient.errors
+    try:
+        response = request.execute(http=http)
+    except googleapiclient.errors.HttpError as e:
+        if e.resp.status == 304:
+            return None, etag
+        raise
+    return playlist_response_videos(response), response.get('etag')
+
+def playlist_response_videos(response):
+    """Converte os itens de uma resposta de playlistItems().list, do mais recente para o mais antigo."""
+    videos = [playlist_item_to_video(item) for item in response.get('items', [])]
+    videos = [video for video in videos if video]
+    # A playlist nem sempre vem ordenada pela data de publicação do vídeo
+    videos.sort(key=lambda x: x['snippet']['publishedAt'], reverse=True)
+    return videos
+
+def request_playlist_videos(youtube, playlist_id, max_results=10, http=None):
+    """Busca os vídeos mais recentes de uma playlist de uploads no formato de search().list."""
+    videos, _ = request_playlist_page(youtube, playlist_id, max_results, http=http)
+    return videos
+
+# Número máximo de itens por página de playlistItems().list
+PLAYLIST_PAGE_SIZE = 50
+
+def iter_playlist_pages(youtube, playlist_id, page_token=None, http=None, page_size=PLAYLIST_PAGE_SIZE):
+    """
+    Percorre uma playlist de uploads página por página, seguindo o nextPageToken.
+    Cada página só é pedida quando a anterior foi consumida (1 unidade de cota por página).
+
+    Args:
+        youtube: Cliente da API do YouTube
+        playlist_id (str): ID da playlist de uploads
+        page_token (str): Página onde começar (ex.: checkpoint de um backfill interrompido)
+        http: Transporte HTTP a usar (um por thread)
+        page_size (int): Itens por página (até 50)
+
+    Yields:
+        tuple: (vídeos da página no formato de search().list, token da próxima página ou None)
+    """
+    while True:
+        response = youtube.playlistItems().list(
+            part="snippet,contentDetails",
+            playlistId=playlist_id,
+            maxResults=page_size,
+            pageToken=page_token
+        ).execute(http=http)
+        page_token = response.get('nextPageToken')
+        yield playlist_response_videos(response), page_token
+        if not page_token:
+            return
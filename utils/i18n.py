@@ -19,9 +19,9 @@ language_names = {
 # Códigos de idioma para nomes
 code_to_name = {v: k for k, v in language_names.items()}
 
-# Inicializar variáveis
+# Inicializar variáveis (as traduções são carregadas no primeiro get_text)
 all_translations = {}
-supported_languages = []
+supported_languages = list(language_names.values())
 
 @st.cache_resource
 def load_translations():
@@ -75,9 +75,6 @@ def get_text(key, lang='en'):
     # Se não existir em nenhum idioma, retorne a própria chave
     return key
 
-# Carregar traduções usando o cache do Streamlit
-all_translations, supported_languages = load_translations()
-
 # Função para adicionar um novo idioma
 def add_language(lang_code, translations_dict):
     """
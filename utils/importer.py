@@ -0,0 +1,129 @@
+"""
+Importação de inscrições do FlowTube.
+Este módulo lê a lista de inscrições exportada pelo Google Takeout (subscriptions.csv)
+ou um arquivo OPML, e confirma os canais e os seus nomes com chamadas de channels().list
+agrupadas em lotes de 50 IDs, consultados em paralelo.
+"""
+
+import io
+import re
+import csv
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.fetcher import DEFAULT_MAX_WORKERS, CHANNELS_BATCH_SIZE, get_thread_http
+
+# ID de canal do YouTube (UC + 22 caracteres)
+_CHANNEL_ID_RE = re.compile(r"UC[\w-]{22}")
+
+def channel_url(channel_id):
+    """Retorna a URL canônica do canal."""
+    return f"https://www.youtube.com/channel/{channel_id}"
+
+def parse_takeout_csv(text):
+    """
+    Lê o subscriptions.csv do Google Takeout (ID, URL e título do canal em cada linha).
+    O cabeçalho muda com o idioma da conta, então as colunas são reconhecidas pelo conteúdo.
+
+    Returns:
+        list: Dicionários {'id', 'url', 'name'}
+    """
+    entries = []
+    for row in csv.reader(io.StringIO(text)):
+        cells = [cell.strip() for cell in row]
+        channel_id = next((cell for cell in cells if _CHANNEL_ID_RE.fullmatch(cell)), None)
+        if not channel_id:
+            # Cabeçalho ou linha em branco
+            continue
+        name = next((cell for cell in cells if cell and cell != channel_id and not cell.startswith('http')), '')
+        entries.append({'id': channel_id, 'url': channel_url(channel_id), 'name': name})
+    return entries
+
+def parse_opml(data):
+    """
+    Lê um arquivo OPML de inscrições (um <outline> por canal, com o feed RSS em xmlUrl).
+
+    Returns:
+        list: Dicionários {'id', 'url', 'name'}
+    """
+    entries = []
+    for outline in ET.fromstring(data).iter('outline'):
+        match = _CHANNEL_ID_RE.search(outline.get('xmlUrl') or outline.get('htmlUrl') or '')
+        if match:
+            name = outline.get('title') or outline.get('text') or ''
+            entries.append({'id': match.group(0), 'url': channel_url(match.group(0)), 'name': name})
+    return entries
+
+def parse_subscriptions(filename, data):
+    """
+    Lê um arquivo de inscrições, CSV do Takeout ou OPML, sem canais repetidos.
+
+    Args:
+        filename (str): Nome do arquivo (a extensão indica o formato)
+        data (bytes): Conteúdo do arquivo
+
+    Returns:
+        list: Dicionários {'id', 'url', 'name'}
+
+    Raises:
+        ValueError: Se o arquivo não puder ser interpretado
+    """
+    text = data.decode('utf-8-sig', errors='replace')
+    try:
+        if filename.lower().endswith(('.opml', '.xml')) or text.lstrip().startswith('<'):
+            entries = parse_opml(text)
+        else:
+            entries = parse_takeout_csv(text)
+    except (ET.ParseError, csv.Error) as e:
+        raise ValueError(str(e)) from e
+    return list({entry['id']: entry for entry in entries}.values())
+
+def lookup_channels(youtube, channel_ids, max_workers=DEFAULT_MAX_WORKERS, progress=None):
+    """
+    Busca o nome e a playlist de uploads dos canais em lotes de 50 IDs (1 unidade de cota por lote),
+    com os lotes consultados em paralelo. Um lote com falha não interrompe os demais.
+
+    Args:
+        youtube: Cliente da API do YouTube
+        channel_ids (list): IDs dos canais
+        max_workers (int): Número máximo de lotes consultados ao mesmo tempo
+        progress (callable): Chamada na thread atual como progress(lotes concluídos, total de lotes)
+
+    Returns:
+        tuple: (dict channel_id -> {'title', 'uploads'} dos canais encontrados, lista de erros dos lotes,
+                conjunto dos IDs dos lotes com falha, sem resposta da API)
+    """
+    channel_ids = list(dict.fromkeys(channel_ids))
+    batches = [channel_ids[i:i + CHANNELS_BATCH_SIZE] for i in range(0, len(channel_ids), CHANNELS_BATCH_SIZE)]
+    channels = {}
+    errors = []
+    failed_ids = set()
+    if not batches:
+        return channels, errors, failed_ids
+
+    def fetch_batch(batch):
+        response = youtube.channels().list(
+            part="snippet,contentDetails",
+            id=",".join(batch),
+            maxResults=CHANNELS_BATCH_SIZE
+        ).execute(http=get_thread_http())
+        return {
+            item['id']: {
+                'title': item.get('snippet', {}).get('title'),
+                'uploads': item.get('contentDetails', {}).get('relatedPlaylists', {}).get('uploads')
+            }
+            for item in response.get('items', [])
+        }
+
+    workers = max(1, min(int(max_workers or DEFAULT_MAX_WORKERS), len(batches)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="flowtube-import") as executor:
+        futures = {executor.submit(fetch_batch, batch): batch for batch in batches}
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                channels.update(future.result())
+            except Exception as e:
+                errors.append(e)
+                failed_ids.update(futures[future])
+            if progress:
+                progress(done, len(batches))
+    return channels, errors, failed_ids
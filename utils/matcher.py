@@ -0,0 +1,89 @@
+"""
+Filtro de palavras-chave do FlowTube.
+Este módulo prepara um conjunto de palavras-chave uma vez por conjunto, reutilizado entre
+reruns: o teste sim/não do filtro usa a busca de substring do próprio Python (em C) sobre
+o menor conjunto equivalente de palavras-chave, e a expressão regular que informa quais
+palavras-chave foram encontradas só é usada nos poucos cards exibidos.
+"""
+
+import re
+from functools import lru_cache
+
+class KeywordMatcher:
+    """Buscador de várias palavras-chave (sem diferenciar maiúsculas).
+    Para o teste sim/não, palavras-chave que contêm outra são descartadas (se "python"
+    está no texto, "python tutorial" não muda o resultado). Para listar as encontradas,
+    um padrão com lookahead testa todas as posições do texto; como em cada posição só a
+    palavra-chave mais longa é capturada, as palavras-chave contidas nela são adicionadas
+    a partir de uma tabela calculada na compilação."""
+
+    def __init__(self, keywords):
+        # Palavra-chave em minúsculas -> forma original (a primeira que aparecer)
+        self.keywords = {}
+        for keyword in keywords:
+            keyword = keyword.strip()
+            if keyword and keyword.lower() not in self.keywords:
+                self.keywords[keyword.lower()] = keyword
+
+        # Menor conjunto equivalente para o teste sim/não, das mais curtas (mais frequentes) para as mais longas
+        shortest_first = sorted(self.keywords, key=len)
+        self._needles = []
+        for keyword in shortest_first:
+            if not any(needle in keyword for needle in self._needles):
+                self._needles.append(keyword)
+
+        self._pattern = None
+        self._contained = None
+
+    def __bool__(self):
+        return bool(self.keywords)
+
+    def contains(self, text):
+        """Indica se o texto, já em minúsculas, contém ao menos uma das palavras-chave."""
+        return any(map(text.__contains__, self._needles))
+
+    def search(self, text):
+        """Indica se o texto contém ao menos uma das palavras-chave."""
+        return self.contains(text.lower())
+
+    def matches(self, text):
+        """Retorna as palavras-chave (na forma original) encontradas no texto."""
+        if not self.keywords:
+            return []
+        if self._pattern is None:
+            # Alternativas mais longas primeiro, para capturar a mais longa em cada posição
+            ordered = sorted(self.keywords, key=len, reverse=True)
+            self._contained = {
+                keyword: frozenset(other for other in ordered if other in keyword)
+                for keyword in ordered
+            }
+            self._pattern = re.compile("(?=(" + "|".join(map(re.escape, ordered)) + "))")
+        found = set()
+        for match in self._pattern.finditer(text.lower()):
+            found.update(self._contained[match.group(1)])
+        return [self.keywords[keyword] for keyword in self.keywords if keyword in found]
+
+def video_text(video):
+    """Retorna o título e a descrição do vídeo (item da API ou registro do banco) em um único texto."""
+    if isinstance(video, dict):
+        snippet = video['snippet']
+        return f"{snippet['title']}\n{snippet['description']}"
+    return f"{video.title}\n{video.description}"
+
+@lru_cache(maxsize=32)
+def compile_keywords(keywords):
+    """Retorna o buscador compilado para a tupla de palavras-chave (reutilizado entre reruns)."""
+    return KeywordMatcher(keywords)
+
+def keywords_key(keywords):
+    """Retorna uma chave de texto estável para o conjunto de palavras-chave."""
+    return "\n".join(sorted({keyword.strip().lower() for keyword in keywords if keyword.strip()}))
+
+@lru_cache(maxsize=32)
+def compile_key(key):
+    """Retorna o buscador da chave de palavras-chave (memorizado pela própria string da chave)."""
+    return KeywordMatcher(key.split("\n"))
+
+def match_key(text, key):
+    """Função para o SQLite: indica (1/0) se o texto (search_text, já em minúsculas) contém alguma palavra-chave da chave."""
+    return 1 if compile_key(key).contains(text) else 0
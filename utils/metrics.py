@@ -0,0 +1,230 @@
+"""
+Métricas do FlowTube.
+Este módulo registra a latência, o custo de cota, o tamanho da resposta e os erros de cada chamada à API,
+os downloads de miniaturas, os erros reportados e o tempo de cada fase de um rerun.
+Os totais ficam em memória (para o painel de depuração) e cada evento é gravado
+como uma linha JSON em data/metrics.jsonl.
+"""
+
+import os
+import re
+import json
+import time
+import threading
+from collections import deque, defaultdict
+from contextlib import contextmanager
+
+from utils.paths import DATA_DIR
+
+# Arquivo padrão de eventos (uma linha JSON por evento)
+METRICS_PATH = os.path.join(DATA_DIR, 'metrics.jsonl')
+
+# Tamanho máximo do arquivo antes de ser rotacionado para metrics.jsonl.1
+MAX_LOG_BYTES = 10 * 1024 * 1024
+
+# Número de latências guardadas por método para os percentis
+LATENCY_SAMPLES = 500
+
+# Chave da API nas URLs das mensagens de erro (nunca gravada no arquivo)
+_API_KEY_RE = re.compile(r'([?&]key=)[^&\s"]+')
+
+# Custo em unidades de cota de cada método da API
+QUOTA_COSTS = {
+    'youtube.search.list': 100,
+    'youtube.channels.list': 1,
+    'youtube.playlistItems.list': 1,
+    'youtube.videos.list': 1,
+    'rss.feed': 0
+}
+
+def redact_api_key(text):
+    """Oculta a chave da API nas URLs de um texto (ex.: mensagem de um HttpError)."""
+    return _API_KEY_RE.sub(r'\1***', text)
+
+def percentile(values, fraction):
+    """Retorna o percentil (0 a 1) de uma lista de valores, ou None se vazia."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class Metrics:
+    """Coletor de métricas compartilhado pelo processo (seguro entre threads)."""
+
+    def __init__(self, log_path=None):
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._file = None
+        self._quota_listener = None
+        self.reset()
+
+    def reset(self):
+        """Zera os totais em memória."""
+        with self._lock:
+            self.calls = defaultdict(lambda: {'calls': 0, 'errors': 0, 'quota': 0, 'bytes': 0, 'seconds': 0.0,
+                                              'latencies': deque(maxlen=LATENCY_SAMPLES)})
+            self.errors = deque(maxlen=50)
+            self.thumbnails = {'downloads': 0, 'errors': 0, 'bytes': 0, 'seconds': 0.0}
+            self.last_rerun = {}
+            self._phases = {}
+
+    def configure(self, log_path):
+        """Define o arquivo de eventos (None desativa a gravação)."""
+        with self._lock:
+            if log_path != self.log_path and self._file is not None:
+                self._file.close()
+                self._file = None
+            self.log_path = log_path
+
+    def set_quota_listener(self, listener):
+        """Define a função chamada com o custo de cota de cada requisição que chegou à API (None desativa)."""
+        self._quota_listener = listener
+
+    def _write(self, event):
+        """Grava um evento como uma linha JSON (chamado com o lock adquirido)."""
+        if not self.log_path:
+            return
+        try:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                self._file = open(self.log_path, 'a', encoding='utf-8', buffering=1)
+            elif self._file.tell() > MAX_LOG_BYTES:
+                self._file.close()
+                os.replace(self.log_path, f"{self.log_path}.1")
+                self._file = open(self.log_path, 'a', encoding='utf-8', buffering=1)
+            line = json.dumps({'ts': round(time.time(), 3), 'pid': os.getpid(), **event}, default=str)
+            self._file.write(redact_api_key(line) + "\n")
+        except OSError:
+            # Métricas nunca interrompem o app
+            self._file = None
+
+    def record_api_call(self, method, seconds, status=200, error=None, size=0):
+        """Registra uma chamada à API: método (ex.: youtube.search.list), latência, status HTTP,
+        erro e tamanho (bytes) do corpo da resposta."""
+        quota = QUOTA_COSTS.get(method, 1)
+        with self._lock:
+            entry = self.calls[method]
+            entry['calls'] += 1
+            entry['quota'] += quota
+            entry['bytes'] += size
+            entry['seconds'] += seconds
+            entry['latencies'].append(seconds)
+            if error is not None:
+                entry['errors'] += 1
+            self._write({'type': 'api', 'method': method, 'seconds': round(seconds, 4), 'status': status,
+                         'quota': quota, 'bytes': size, 'error': str(error) if error is not None else None})
+        # Sem status a requisição não chegou à API e não gastou cota
+        listener = self._quota_listener
+        if listener is not None and quota and status is not None:
+            try:
+                listener(quota)
+            except Exception:
+                # Métricas nunca interrompem o app
+                pass
+
+    def record_thumbnail(self, seconds, size=0, error=None):
+        """Registra o download de uma miniatura."""
+        with self._lock:
+            self.thumbnails['downloads'] += 1
+            self.thumbnails['seconds'] += seconds
+            self.thumbnails['bytes'] += size
+            if error is not None:
+                self.thumbnails['errors'] += 1
+            self._write({'type': 'thumbnail', 'seconds': round(seconds, 4), 'bytes': size,
+                         'error': str(error) if error is not None else None})
+
+    def record_error(self, key, *args):
+        """Registra um aviso ou erro reportado ao usuário (sem a chave da API, também no painel de depuração)."""
+        detail = [redact_api_key(str(arg)) for arg in args]
+        with self._lock:
+            self.errors.append((time.time(), key, " ".join(detail)))
+            self._write({'type': 'error', 'key': key, 'detail': detail})
+
+    @contextmanager
+    def phase(self, name):
+        """Mede o tempo de uma fase do rerun atual."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._phases[name] = self._phases.get(name, 0.0) + time.perf_counter() - start
+
+    @contextmanager
+    def rerun(self):
+        """Mede um rerun completo e grava as fases medidas durante ele."""
+        with self._lock:
+            self._phases = {}
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            total = time.perf_counter() - start
+            with self._lock:
+                self.last_rerun = {'total': total, **self._phases}
+                self._write({'type': 'rerun', 'seconds': round(total, 4),
+                             'phases': {name: round(seconds, 4) for name, seconds in self._phases.items()}})
+
+    def api_summary(self):
+        """Retorna os totais por método: chamadas, erros, cota, KB recebidos, latência média e p95 (ms)."""
+        with self._lock:
+            return [
+                {
+                    'method': method,
+                    'calls': entry['calls'],
+                    'errors': entry['errors'],
+                    'quota': entry['quota'],
+                    'kb': round(entry['bytes'] / 1024, 1),
+                    'avg_ms': round(entry['seconds'] / entry['calls'] * 1000, 1) if entry['calls'] else None,
+                    'p95_ms': round(percentile(entry['latencies'], 0.95) * 1000, 1) if entry['latencies'] else None
+                }
+                for method, entry in sorted(self.calls.items())
+            ]
+
+    def total_quota(self):
+        """Retorna o total de unidades de cota gastas pelo processo."""
+        with self._lock:
+            return sum(entry['quota'] for entry in self.calls.values())
+
+    def total_bytes(self):
+        """Retorna o total de bytes recebidos nas respostas da API pelo processo."""
+        with self._lock:
+            return sum(entry['bytes'] for entry in self.calls.values())
+
+# Coletor compartilhado pelo processo
+metrics = Metrics()
+
+def instrumented_request_class():
+    """Retorna uma subclasse de HttpRequest cujo execute() registra latência, cota, tamanho e erros."""
+    # Importação adiada: o googleapiclient só é carregado quando a API é usada
+    from googleapiclient.errors import HttpError
+    from googleapiclient.http import HttpRequest
+
+    class InstrumentedHttpRequest(HttpRequest):
+        def execute(self, http=None, num_retries=0):
+            start = time.perf_counter()
+            status, error, size = 200, None, 0
+            postproc = self.postproc
+
+            # Medir o corpo da resposta (já descompactado pelo httplib2) antes de interpretá-lo
+            def measured_postproc(resp, content):
+                nonlocal size
+                size = len(content or b'')
+                return postproc(resp, content)
+
+            self.postproc = measured_postproc
+            try:
+                return super().execute(http=http, num_retries=num_retries)
+            except HttpError as e:
+                status = e.resp.status
+                # 304 (If-None-Match) não é erro: o conteúdo não mudou
+                error = None if status == 304 else e
+                raise
+            except Exception as e:
+                status, error = None, e
+                raise
+            finally:
+                self.postproc = postproc
+                metrics.record_api_call(self.methodId, time.perf_counter() - start, status, error, size)
+
+    return InstrumentedHttpRequest
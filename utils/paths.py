@@ -0,0 +1,13 @@
+"""
+Caminhos de dados do FlowTube.
+A variável de ambiente FLOWTUBE_DATA_DIR permite usar outro diretório de dados
+(por exemplo, nos benchmarks ou em um serviço de atualização separado).
+"""
+
+import os
+
+# Diretório raiz do projeto
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Diretório de dados (configuração, banco local e cache de miniaturas)
+DATA_DIR = os.getenv('FLOWTUBE_DATA_DIR') or os.path.join(ROOT_DIR, 'data')
@@ -0,0 +1,298 @@
+"""
+Ordenação do feed por relevância do FlowTube.
+Este módulo pontua os vídeos do banco local contra as palavras-chave com BM25, multiplicado
+por um decaimento exponencial pela data de publicação. Cada vídeo é tokenizado uma única vez
+em uma matriz esparsa (vídeos x vocabulário, em formato CSR com NumPy), independente das
+palavras-chave: os vídeos novos só acrescentam linhas, e trocar as palavras-chave apenas
+escolhe outras colunas da mesma matriz.
+"""
+
+import threading
+from itertools import chain
+
+import numpy as np
+
+from utils.matcher import keywords_key
+from utils.store import FTS_WEIGHTS
+
+# Parâmetros do BM25: saturação da frequência e normalização pelo tamanho do texto
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Meia-vida (dias) do decaimento pela idade: um vídeo com esse tempo a mais vale metade
+DEFAULT_HALF_LIFE_DAYS = 14
+
+# Vídeos lidos do banco e tokenizados por bloco
+BUILD_CHUNK = 5000
+
+def parse_published(values):
+    """Converte datas publishedAt (2024-06-01T12:00:00Z) em segundos desde a época (vetor int64)."""
+    return np.array([value[:19] for value in values], dtype='datetime64[s]').astype(np.int64)
+
+def keyword_parts(keyword):
+    """Retorna as partes de uma palavra-chave separadas por espaço (cada parte cabe em um token)."""
+    return keyword.split()
+
+class RelevanceIndex:
+    """Índice de relevância em memória sobre os vídeos do banco, compartilhado pelo processo.
+    Novos vídeos são detectados pelo maior rowid da tabela (inclusive os gravados pelo
+    atualizador em segundo plano) e só acrescentam linhas à matriz de tokens."""
+
+    def __init__(self, store, half_life_days=DEFAULT_HALF_LIFE_DAYS):
+        self.store = store
+        self.half_life = half_life_days * 86400
+        self._lock = threading.Lock()
+        self._last_rowid = 0
+
+        # Vídeos (linhas)
+        self._video_ids = []
+        self._id_array = np.empty(0, dtype=object)
+        self._positions = {}
+        self._channel_codes = {}
+        self._channels = np.empty(0, dtype=np.int32)
+        self._published = np.empty(0, dtype=np.int64)
+        self._lengths = np.empty(0, dtype=np.float32)
+
+        # Matriz esparsa CSR: tokens do vídeo i em indices[indptr[i]:indptr[i + 1]], com a frequência
+        # ponderada (título com o peso da busca textual) em weights
+        self._vocabulary = {}
+        self._tokens = []
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.empty(0, dtype=np.int32)
+        self._weights = np.empty(0, dtype=np.float32)
+
+        # Tokens do vocabulário que contêm cada parte de palavra-chave: parte -> (IDs, tamanho do vocabulário verificado)
+        self._part_tokens = {}
+        self._joined = None
+
+        # Resultados que dependem das palavras-chave e do histórico de assistidos
+        self._keyword_scores = None
+        self._watched = np.empty(0, dtype=bool)
+        self._watched_version = None
+        self._cached = None
+
+    def _update(self):
+        """Tokeniza e acrescenta à matriz os vídeos inseridos desde a última leitura."""
+        last_rowid = self.store.max_rowid()
+        if last_rowid == self._last_rowid:
+            return
+
+        channels, published, lengths, indptr, indices, weights = [], [], [], [], [], []
+        offset = len(self._indices)
+        for rows in self.store.iter_video_texts(self._last_rowid, last_rowid, chunk=BUILD_CHUNK):
+            for row in rows:
+                self._positions[row[1]] = len(self._video_ids)
+                self._video_ids.append(row[1])
+            chunk_indptr, chunk_indices, chunk_weights, chunk_lengths = self._tokenize(
+                [row[4] for row in rows], [row[5] for row in rows]
+            )
+            indptr.append(chunk_indptr + offset)
+            offset += len(chunk_indices)
+            indices.append(chunk_indices)
+            weights.append(chunk_weights)
+            lengths.append(chunk_lengths)
+            channels.append(np.fromiter(
+                (self._channel_codes.setdefault(row[2], len(self._channel_codes)) for row in rows),
+                dtype=np.int32, count=len(rows)
+            ))
+            published.append(parse_published([row[3] for row in rows]))
+
+        if indptr:
+            self._indptr = np.concatenate([self._indptr, *indptr])
+            self._indices = np.concatenate([self._indices, *indices])
+            self._weights = np.concatenate([self._weights, *weights])
+            self._lengths = np.concatenate([self._lengths, *lengths])
+            self._channels = np.concatenate([self._channels, *channels])
+            self._published = np.concatenate([self._published, *published])
+            self._id_array = np.array(self._video_ids, dtype=object)
+            # Vídeos novos invalidam as pontuações e a máscara de assistidos
+            self._keyword_scores = None
+            self._watched_version = None
+        self._last_rowid = last_rowid
+
+    def _token_ids(self, texts):
+        """Converte os textos em IDs de tokens (acrescentando os novos ao vocabulário).
+
+        Returns:
+            tuple: (IDs int64 de todos os tokens, em sequência; número de tokens de cada texto)
+        """
+        # Tokens separados por espaço: uma palavra-chave sem espaço contida no texto está sempre
+        # dentro de um único token, então a busca por substring nos tokens é exata
+        words = [text.split() for text in texts]
+        sizes = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+        vocabulary = self._vocabulary
+        # Palavras novas do bloco entram no vocabulário antes da conversão (tudo em laços de C)
+        new_words = [word for word in dict.fromkeys(chain.from_iterable(words)) if word not in vocabulary]
+        vocabulary.update(zip(new_words, range(len(vocabulary), len(vocabulary) + len(new_words))))
+        self._tokens.extend(new_words)
+        ids = np.fromiter(map(vocabulary.__getitem__, chain.from_iterable(words)), dtype=np.int64, count=int(sizes.sum()))
+        return ids, sizes
+
+    def _tokenize(self, titles, texts):
+        """
+        Monta as linhas CSR de um bloco de vídeos: a contagem de cada token é feita com NumPy
+        sobre os pares (vídeo, token) do bloco inteiro, e as ocorrências no título recebem o peso
+        do título da busca textual.
+
+        Returns:
+            tuple: (indptr do bloco a partir de 0, IDs dos tokens, frequências ponderadas, tamanhos dos textos)
+        """
+        ids, sizes = self._token_ids(texts)
+        title_ids, title_sizes = self._token_ids([title.lower() for title in titles])
+        stride = max(len(self._tokens), 1)
+        cells, counts = np.unique(np.repeat(np.arange(len(texts)), sizes) * stride + ids, return_counts=True)
+        title_cells, title_counts = np.unique(
+            np.repeat(np.arange(len(titles)), title_sizes) * stride + title_ids, return_counts=True
+        )
+        # Ocorrências de cada (vídeo, token) no título, limitadas às do texto completo
+        in_title = np.zeros(len(cells), dtype=np.int64)
+        if len(title_cells):
+            positions = np.minimum(np.searchsorted(title_cells, cells), len(title_cells) - 1)
+            in_title = np.where(title_cells[positions] == cells, np.minimum(title_counts[positions], counts), 0)
+        weights = (FTS_WEIGHTS[0] * in_title + FTS_WEIGHTS[1] * (counts - in_title)).astype(np.float32)
+        indptr = np.cumsum(np.bincount(cells // stride, minlength=len(texts)))
+        return indptr, (cells % stride).astype(np.int32), weights, sizes.astype(np.float32)
+
+    def _tokens_containing(self, part):
+        """Retorna os IDs dos tokens do vocabulário que contêm a parte (mesma regra de substring do filtro).
+        O resultado fica guardado; quando o vocabulário cresce, só os tokens novos são verificados."""
+        token_ids, checked = self._part_tokens.get(part, (np.empty(0, dtype=np.int32), 0))
+        if checked < len(self._tokens):
+            # Uma única busca em C sobre o vocabulário novo, unido em um texto só (montado uma vez por trecho)
+            if self._joined is None or self._joined[0] != (checked, len(self._tokens)):
+                tokens = self._tokens[checked:]
+                starts = np.cumsum([0] + [len(token) + 1 for token in tokens[:-1]])
+                self._joined = ((checked, len(self._tokens)), "\n".join(tokens), starts)
+            _, joined, starts = self._joined
+            found = []
+            position = joined.find(part)
+            while position != -1:
+                found.append(position)
+                position = joined.find(part, position + 1)
+            if found:
+                new_ids = np.unique(np.searchsorted(starts, found, side='right') - 1).astype(np.int32) + checked
+                token_ids = np.concatenate([token_ids, new_ids])
+            self._part_tokens[part] = (token_ids, len(self._tokens))
+        return token_ids
+
+    def _score_keywords(self, key):
+        """
+        Calcula, para todos os vídeos, a pontuação BM25 das palavras-chave e quais vídeos contêm
+        alguma delas, a partir das colunas da matriz de tokens que correspondem às palavras-chave.
+
+        Returns:
+            tuple: (pontuação float64 por vídeo, máscara dos vídeos que contêm alguma palavra-chave)
+        """
+        count = len(self._video_ids)
+        keywords = key.split("\n")
+
+        # Pares (token, coluna da palavra-chave, peso); uma palavra-chave de várias palavras
+        # divide o peso entre as partes
+        pair_tokens, pair_columns, pair_weights = [], [], []
+        multi_part = np.zeros(len(keywords), dtype=bool)
+        for column, keyword in enumerate(keywords):
+            parts = keyword_parts(keyword)
+            multi_part[column] = len(parts) > 1
+            for part in parts:
+                token_ids = self._tokens_containing(part)
+                pair_tokens.append(token_ids)
+                pair_columns.append(np.full(len(token_ids), column, dtype=np.int64))
+                pair_weights.append(np.full(len(token_ids), 1.0 / len(parts)))
+        if not pair_tokens or not sum(len(tokens) for tokens in pair_tokens):
+            return np.zeros(count), np.zeros(count, dtype=bool)
+        pair_tokens = np.concatenate(pair_tokens)
+        order = np.argsort(pair_tokens, kind='stable')
+        pair_tokens = pair_tokens[order]
+        pair_columns = np.concatenate(pair_columns)[order]
+        pair_weights = np.concatenate(pair_weights)[order]
+
+        # Entradas da matriz cujos tokens correspondem a alguma palavra-chave, expandidas para cada par
+        degree = np.bincount(pair_tokens, minlength=len(self._tokens))
+        first_pair = np.cumsum(degree) - degree
+        entries = np.flatnonzero(degree[self._indices] > 0)
+        entry_tokens = self._indices[entries]
+        repeats = degree[entry_tokens]
+        expanded = np.repeat(entries, repeats)
+        pairs = np.repeat(first_pair[entry_tokens] - (np.cumsum(repeats) - repeats), repeats) + np.arange(repeats.sum())
+
+        # Frequência de cada (vídeo, palavra-chave) com ocorrência
+        videos = np.searchsorted(self._indptr, expanded, side='right') - 1
+        cells, inverse = np.unique(videos * len(keywords) + pair_columns[pairs], return_inverse=True)
+        tf = np.bincount(inverse, weights=self._weights[expanded] * pair_weights[pairs])
+        cell_videos = cells // len(keywords)
+        cell_columns = cells % len(keywords)
+
+        # BM25 com IDF sobre todos os vídeos armazenados, não só os do feed
+        document_frequency = np.bincount(cell_columns, minlength=len(keywords))
+        idf = np.log1p((count - document_frequency + 0.5) / (document_frequency + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[cell_videos] / max(float(self._lengths.mean()), 1.0))
+        scores = np.bincount(
+            cell_videos, weights=idf[cell_columns] * tf * (BM25_K1 + 1) / (tf + norm), minlength=count
+        )
+
+        # Palavras-chave de uma parte casam com certeza; as de várias palavras só têm as partes
+        # em algum lugar do texto, então esses vídeos são conferidos com o filtro do banco
+        matched = np.zeros(count, dtype=bool)
+        matched[cell_videos[~multi_part[cell_columns]]] = True
+        candidates = np.setdiff1d(cell_videos[multi_part[cell_columns]], np.flatnonzero(matched))
+        if len(candidates):
+            confirmed = self.store.matching(self._id_array[candidates].tolist(), key)
+            matched[[self._positions[video_id] for video_id in confirmed]] = True
+        return scores, matched
+
+    def _update_watched(self):
+        """Recalcula a máscara de vídeos assistidos quando o histórico mudou."""
+        if self._watched_version == self.store.watched_version:
+            return
+        self._watched_version = self.store.watched_version
+        watched = np.zeros(len(self._video_ids), dtype=bool)
+        positions = [self._positions[video_id] for video_id in self.store.watched() if video_id in self._positions]
+        watched[positions] = True
+        self._watched = watched
+
+    def rank(self, channel_ids, keywords=None, hide_watched=False):
+        """
+        Ordena os vídeos do feed por relevância.
+
+        Args:
+            channel_ids (list): IDs dos canais do feed
+            keywords (list): Palavras-chave; como no feed por data, só entram vídeos com ao menos uma
+            hide_watched (bool): Excluir os vídeos assistidos
+
+        Returns:
+            list: IDs dos vídeos, dos mais relevantes para os menos
+        """
+        if not channel_ids:
+            return []
+        key = keywords_key(keywords or [])
+        with self._lock:
+            self._update()
+            if hide_watched:
+                self._update_watched()
+            cache_key = (tuple(channel_ids), key, hide_watched, self._last_rowid, self._watched_version if hide_watched else None)
+            if self._cached and self._cached[0] == cache_key:
+                return self._cached[1]
+
+            codes = [self._channel_codes[channel_id] for channel_id in channel_ids if channel_id in self._channel_codes]
+            mask = np.isin(self._channels, codes)
+            if key:
+                if self._keyword_scores is None or self._keyword_scores[0] != key:
+                    self._keyword_scores = (key, *self._score_keywords(key))
+                relevance, matched = self._keyword_scores[1:]
+                mask &= matched
+            else:
+                relevance = np.ones(len(self._video_ids))
+            if hide_watched:
+                mask &= ~self._watched
+            rows = np.flatnonzero(mask)
+
+            ranked = []
+            if len(rows):
+                published = self._published[rows]
+                # Decaimento relativo ao vídeo mais recente (a ordem não depende da data atual)
+                scores = relevance[rows] * np.exp2((published - published.max()) / self.half_life)
+                # Maior pontuação primeiro; empates pela data de publicação
+                order = rows[np.lexsort((-published, -scores))]
+                ranked = self._id_array[order].tolist()
+            self._cached = (cache_key, ranked)
+            return ranked
@@ -0,0 +1,133 @@
+"""
+Controle das chamadas à API do FlowTube.
+Este módulo limita a taxa de chamadas com um token bucket compartilhado pelo processo,
+calcula as esperas (backoff exponencial com jitter) entre novas tentativas de erros
+temporários e mantém um disjuntor que bloqueia todas as chamadas depois que a cota
+diária acaba, até o horário em que ela é renovada (meia-noite no horário do Pacífico).
+"""
+
+import json
+import time
+import random
+import threading
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+# Taxa padrão de chamadas por segundo (0: sem limite, os erros 429 são tratados pelo backoff) e rajada máxima
+DEFAULT_RATE_LIMIT = 0
+DEFAULT_BURST = 10
+
+# Novas tentativas de um erro temporário e limites da espera entre elas (segundos)
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 32.0
+
+# Status HTTP que indicam um erro temporário
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Motivos (error.errors[].reason) de erro temporário e de cota esgotada
+RETRYABLE_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded', 'backendError'}
+QUOTA_REASONS = {'quotaExceeded', 'dailyLimitExceeded'}
+
+# Fuso em que a cota diária da API é renovada
+QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+
+class QuotaExhausted(Exception):
+    """A cota diária da API acabou; nenhuma chamada é feita até a renovação."""
+
+class TokenBucket:
+    """Limitador de taxa (token bucket) seguro entre threads."""
+
+    def __init__(self, rate=DEFAULT_RATE_LIMIT, burst=DEFAULT_BURST):
+        self._lock = threading.Lock()
+        self.configure(rate, burst)
+
+    def configure(self, rate, burst=None):
+        """Define a taxa (chamadas por segundo; 0 desativa o limite) e a rajada máxima."""
+        with self._lock:
+            self.rate = float(rate or 0)
+            self.burst = max(1.0, float(burst or self.rate or 1))
+            self._tokens = self.burst
+            self._updated = time.monotonic()
+
+    def acquire(self):
+        """Espera até haver uma ficha disponível e a consome."""
+        while True:
+            with self._lock:
+                if not self.rate:
+                    return
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class QuotaBreaker:
+    """Disjuntor de cota: aberto, bloqueia as chamadas até a renovação da cota diária."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open_until = 0.0
+
+    def trip(self, now=None):
+        """Abre o disjuntor até a próxima renovação da cota."""
+        with self._lock:
+            self.open_until = max(self.open_until, next_quota_reset(now))
+
+    def reset(self):
+        """Fecha o disjuntor."""
+        with self._lock:
+            self.open_until = 0.0
+
+    def is_open(self, now=None):
+        """Indica se as chamadas estão bloqueadas."""
+        now = now if now is not None else time.time()
+        return now < self.open_until
+
+    def check(self):
+        """Lança QuotaExhausted se o disjuntor estiver aberto."""
+        if self.is_open():
+            raise QuotaExhausted(f"Cota diária esgotada até {datetime.fromtimestamp(self.open_until):%H:%M}")
+
+def next_quota_reset(now=None):
+    """Retorna o timestamp da próxima renovação da cota (meia-noite no horário do Pacífico)."""
+    now = datetime.fromtimestamp(now if now is not None else time.time(), QUOTA_TIMEZONE)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight.timestamp()
+
+def error_reasons(error):
+    """Retorna os motivos (reason) de um HttpError da API."""
+    reasons = {detail.get('reason') for detail in getattr(error, 'error_details', None) or [] if isinstance(detail, dict)}
+    if not reasons:
+        try:
+            content = json.loads(error.content)
+            reasons = {detail.get('reason') for detail in content.get('error', {}).get('errors', [])}
+        except (AttributeError, TypeError, ValueError):
+            pass
+    reasons.discard(None)
+    return reasons
+
+def is_quota_error(error):
+    """Indica se o erro é de cota diária esgotada."""
+    return bool(error_reasons(error) & QUOTA_REASONS)
+
+def is_retryable(error):
+    """Indica se vale a pena tentar a chamada de novo."""
+    status = error.resp.status
+    return status in RETRYABLE_STATUSES or (status == 403 and bool(error_reasons(error) & RETRYABLE_REASONS))
+
+def backoff_delay(attempt, retry_after=None):
+    """Espera antes da nova tentativa: exponencial com jitter completo, ou o Retry-After do servidor."""
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+# Limitador e disjuntor compartilhados por todas as chamadas do processo
+rate_limiter = TokenBucket()
+quota_breaker = QuotaBreaker()
@@ -0,0 +1,134 @@
+"""
+Resolução de canais do FlowTube.
+Este módulo converte URLs de canais (/channel/, @handle, /c/ e /user/) em IDs usando
+channels().list com forHandle/forUsername (1 unidade de cota, em vez de 100 da busca),
+resolve as URLs pendentes em lote e guarda as falhas por um tempo, para que URLs
+inválidas não sejam consultadas de novo a cada rerun.
+"""
+
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.fetcher import DEFAULT_MAX_WORKERS, get_thread_http
+
+# Tempo durante o qual uma URL que falhou não é consultada de novo (6 horas)
+DEFAULT_FAILURE_TTL = 6 * 3600
+
+# Motivos de falha
+FAILURE_INVALID_URL = "invalid_url"
+FAILURE_NOT_FOUND = "not_found"
+
+def parse_channel_url(channel_url):
+    """
+    Identifica o tipo de URL do canal.
+
+    Returns:
+        tuple: (tipo, valor), onde tipo é 'id', 'handle', 'username' ou 'custom'; (None, None) se inválida
+    """
+    if '/channel/' in channel_url:
+        return 'id', channel_url.split('/channel/')[1].split('/')[0]
+    if '/user/' in channel_url:
+        return 'username', channel_url.split('/user/')[1].split('/')[0]
+    if '/c/' in channel_url:
+        return 'custom', channel_url.split('/c/')[1].split('/')[0]
+    if '@' in channel_url:
+        return 'handle', '@' + channel_url.split('@')[-1].split('/')[0].split('?')[0]
+    return None, None
+
+def lookup_channel(youtube, kind, value, http=None):
+    """
+    Busca o canal por handle ou nome de usuário com channels().list.
+
+    Returns:
+        tuple: (channel_id, título) ou None se o canal não foi encontrado
+    """
+    if kind == 'handle':
+        attempts = [('forHandle', value)]
+    elif kind == 'username':
+        attempts = [('forUsername', value), ('forHandle', '@' + value)]
+    else:
+        # URLs /c/ não têm consulta própria; hoje quase sempre coincidem com o handle
+        attempts = [('forHandle', '@' + value), ('forUsername', value)]
+
+    for parameter, argument in attempts:
+        response = youtube.channels().list(part="snippet", **{parameter: argument}).execute(http=http)
+        if response.get('items'):
+            item = response['items'][0]
+            return item['id'], item['snippet']['title']
+    return None
+
+def resolve_channels(youtube, channel_urls, cache, failures, max_workers=DEFAULT_MAX_WORKERS,
+                     failure_ttl=DEFAULT_FAILURE_TTL, retry_failed=False, lock=None):
+    """
+    Resolve em lote as URLs que ainda não estão no cache.
+
+    Args:
+        youtube: Cliente da API do YouTube
+        channel_urls (list): URLs dos canais
+        cache (dict): Cache URL -> ID do canal (normalmente config['channel_ids']), atualizado no lugar
+        failures (dict): Cache URL -> horário da última falha (normalmente config['channel_failures'])
+        max_workers (int): Número máximo de consultas simultâneas
+        failure_ttl (int): Segundos durante os quais uma falha não é consultada de novo
+        retry_failed (bool): Ignorar o cache de falhas (ex.: o usuário adicionou o canal de novo)
+        lock: Lock adquirido ao alterar os caches (ex.: config.lock); as consultas à API ficam fora dele
+
+    Returns:
+        tuple: (dict URL -> título dos canais resolvidos pela API,
+                dict URL -> motivo ou exceção das novas falhas,
+                bool indicando se os caches mudaram e precisam ser salvos)
+    """
+    now = time.time()
+    titles = {}
+    failed = {}
+    changed = False
+    lookups = []
+    lock = lock if lock is not None else nullcontext()
+
+    with lock:
+        for channel_url in dict.fromkeys(channel_urls):
+            if channel_url in cache:
+                continue
+            if not retry_failed and now - failures.get(channel_url, 0) < failure_ttl:
+                continue
+
+            kind, value = parse_channel_url(channel_url)
+            if kind == 'id' and value:
+                # O ID já está na URL; não é preciso consultar a API
+                cache[channel_url] = value
+                failures.pop(channel_url, None)
+                changed = True
+            elif kind and value:
+                lookups.append((channel_url, kind, value))
+            else:
+                failures[channel_url] = now
+                failed[channel_url] = FAILURE_INVALID_URL
+                changed = True
+
+    if not lookups:
+        return titles, failed, changed
+
+    def run(lookup):
+        channel_url, kind, value = lookup
+        try:
+            return channel_url, lookup_channel(youtube, kind, value, http=get_thread_http()), None
+        except Exception as e:
+            return channel_url, None, e
+
+    workers = max(1, min(int(max_workers or DEFAULT_MAX_WORKERS), len(lookups)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="flowtube-resolve") as executor:
+        for channel_url, result, error in executor.map(run, lookups):
+            if error is not None:
+                # Erros de rede/cota não entram no cache de falhas
+                failed[channel_url] = error
+                continue
+            with lock:
+                if result is None:
+                    failures[channel_url] = now
+                    failed[channel_url] = FAILURE_NOT_FOUND
+                else:
+                    cache[channel_url], titles[channel_url] = result
+                    failures.pop(channel_url, None)
+            changed = True
+
+    return titles, failed, changed
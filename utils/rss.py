@@ -0,0 +1,164 @@
+"""
+Backend de busca pelos feeds RSS (Atom) públicos dos canais do FlowTube.
+Cada canal tem um feed em /feeds/videos.xml?channel_id=... com os seus 15 vídeos mais
+recentes, que não gasta cota da API. Os feeds são baixados por uma sessão HTTP com pool
+de conexões e interpretados com iterparse, sem montar a árvore XML inteira na memória.
+"""
+
+import os
+import time
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+
+from utils.metrics import metrics
+
+# Endereço dos feeds (YOUTUBE_FEED_URL aponta para outro servidor, como a API sintética dos benchmarks)
+FEED_URL = "https://www.youtube.com/feeds/videos.xml"
+
+# Número de vídeos que o YouTube publica em cada feed
+FEED_SIZE = 15
+
+# Tempo limite de cada requisição (segundos)
+REQUEST_TIMEOUT = 10
+
+# Conexões mantidas abertas no pool (mais que o número padrão de workers da busca)
+POOL_SIZE = 16
+
+# Espaços de nomes do feed
+ATOM = "{http://www.w3.org/2005/Atom}"
+YT = "{http://www.youtube.com/xml/schemas/2015}"
+MEDIA = "{http://search.yahoo.com/mrss/}"
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Retorna a sessão HTTP compartilhada dos feeds, com pool de conexões keep-alive."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # Importação adiada: o requests só é carregado na primeira busca por RSS
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+def feed_url():
+    """Retorna o endereço dos feeds."""
+    return os.getenv('YOUTUBE_FEED_URL') or FEED_URL
+
+def normalize_published(value):
+    """Converte a data do feed (2024-06-01T12:00:00+00:00) para o formato do publishedAt da API."""
+    try:
+        published = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+    return published.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def entry_to_video(entry):
+    """Converte um <entry> do feed para o formato de item de search().list.
+    Retorna None se faltar o ID ou a data de publicação."""
+    video_id = entry.findtext(f"{YT}videoId")
+    published_at = normalize_published(entry.findtext(f"{ATOM}published"))
+    if not video_id or not published_at:
+        return None
+
+    group = entry.find(f"{MEDIA}group")
+    thumbnail = group.find(f"{MEDIA}thumbnail") if group is not None else None
+    thumbnails = {}
+    if thumbnail is not None and thumbnail.get('url'):
+        thumbnails['high'] = {
+            'url': thumbnail.get('url'),
+            'width': int(thumbnail.get('width') or 0),
+            'height': int(thumbnail.get('height') or 0)
+        }
+
+    return {
+        'kind': 'youtube#searchResult',
+        'id': {
+            'kind': 'youtube#video',
+            'videoId': video_id
+        },
+        'snippet': {
+            'publishedAt': published_at,
+            'channelId': entry.findtext(f"{YT}channelId"),
+            'title': entry.findtext(f"{ATOM}title") or '',
+            'description': (group.findtext(f"{MEDIA}description") if group is not None else None) or '',
+            'thumbnails': thumbnails,
+            'channelTitle': entry.findtext(f"{ATOM}author/{ATOM}name") or ''
+        }
+    }
+
+class CountingReader:
+    """Envolve um fluxo de leitura contando os bytes lidos."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.size += len(data)
+        return data
+
+def parse_feed(stream):
+    """
+    Interpreta um feed Atom de canal de forma incremental.
+
+    Args:
+        stream: Arquivo ou fluxo de bytes com o XML
+
+    Returns:
+        list: Vídeos no formato de search().list, do mais recente para o mais antigo
+    """
+    videos = []
+    for _, element in ET.iterparse(stream, events=('end',)):
+        if element.tag != f"{ATOM}entry":
+            continue
+        video = entry_to_video(element)
+        if video:
+            videos.append(video)
+        # Liberar o <entry> já convertido
+        element.clear()
+    videos.sort(key=lambda x: x['snippet']['publishedAt'], reverse=True)
+    return videos
+
+def request_feed_videos(channel_id, max_results=FEED_SIZE, etag=None):
+    """
+    Busca os vídeos mais recentes do canal pelo feed RSS (sem custo de cota).
+
+    Args:
+        channel_id (str): ID do canal
+        max_results (int): Número máximo de vídeos retornados (o feed tem até 15)
+        etag (str): ETag da resposta anterior, enviado em If-None-Match
+
+    Returns:
+        tuple: (vídeos, etag); vídeos é None quando o feed não mudou (resposta 304)
+    """
+    start = time.perf_counter()
+    status, error, size = None, None, 0
+    try:
+        headers = {'If-None-Match': etag} if etag else {}
+        with get_session().get(feed_url(), params={'channel_id': channel_id}, headers=headers,
+                               timeout=REQUEST_TIMEOUT, stream=True) as response:
+            status = response.status_code
+            if status == 304:
+                return None, etag
+            response.raise_for_status()
+            # Descompactar (gzip) enquanto o XML é lido
+            response.raw.decode_content = True
+            reader = CountingReader(response.raw)
+            videos = parse_feed(reader)
+            size = reader.size
+            return videos[:max_results], response.headers.get('ETag')
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        metrics.record_api_call('rss.feed', time.perf_counter() - start, status, error, size)
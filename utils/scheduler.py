@@ -0,0 +1,146 @@
+"""
+Agenda adaptativa de verificação dos canais do FlowTube.
+Este módulo estima o ritmo de publicação de cada canal a partir dos publishedAt já
+armazenados, define o intervalo até a próxima verificação e o tamanho da página pedida,
+e escolhe quais canais vencidos cabem no orçamento diário de cota da API.
+"""
+
+import math
+import time
+from datetime import datetime
+
+from utils.ratelimit import QUOTA_TIMEZONE
+
+# Número padrão de vídeos pedidos na primeira página de uma atualização incremental
+INCREMENTAL_PAGE_SIZE = 5
+
+# Limites do intervalo entre verificações de um canal (1 hora a 7 dias)
+MIN_POLL_INTERVAL = 3600
+MAX_POLL_INTERVAL = 7 * 86400
+
+# Fração do intervalo típico entre uploads usada como intervalo de verificação
+POLL_FRACTION = 0.5
+
+# Número de vídeos mais recentes usados para estimar o ritmo de publicação
+HISTORY_SIZE = 20
+
+# Orçamento diário padrão de cota (a cota gratuita da API é de 10.000 unidades por dia)
+DEFAULT_QUOTA_BUDGET = 5000
+
+# Espera antes de tentar de novo um canal cuja atualização falhou: dobra a cada falha seguida (5 min a 6 horas)
+FAILURE_RETRY_BASE = 300
+FAILURE_RETRY_MAX = 6 * 3600
+
+# Custo em unidades de cota de uma verificação de canal em cada backend
+POLL_COSTS = {'search': 100, 'playlist': 1, 'rss': 0}
+
+def parse_published(value):
+    """Converte um publishedAt (ISO 8601) em timestamp."""
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+def quota_day(now=None):
+    """Retorna o dia (AAAA-MM-DD, no horário do Pacífico, em que a cota é renovada) ao qual o gasto de cota é atribuído."""
+    now = now if now is not None else time.time()
+    return datetime.fromtimestamp(now, QUOTA_TIMEZONE).strftime('%Y-%m-%d')
+
+def failure_retry_delay(failures):
+    """Retorna a espera (segundos) antes de tentar de novo um canal após o número dado de falhas seguidas."""
+    return min(FAILURE_RETRY_MAX, FAILURE_RETRY_BASE * 2 ** (max(1, failures) - 1))
+
+def skip_failed_channels(store, channel_ids, now=None):
+    """Retorna os canais sem uma falha recente, deixando de fora os que ainda estão na espera após falhar."""
+    failures = store.channel_errors(channel_ids)
+    if not failures:
+        return list(channel_ids)
+    now = now if now is not None else time.time()
+    return [
+        channel_id for channel_id in channel_ids
+        if channel_id not in failures
+        or now - failures[channel_id][1] >= failure_retry_delay(failures[channel_id][2])
+    ]
+
+def estimate_upload_interval(published_times, now=None):
+    """
+    Estima o intervalo típico (segundos) entre uploads do canal.
+
+    Args:
+        published_times (list): publishedAt dos vídeos mais recentes do canal
+        now (float): Horário atual
+
+    Returns:
+        float: Intervalo estimado, ou None com menos de dois vídeos
+    """
+    times = sorted((parse_published(value) for value in published_times), reverse=True)
+    if len(times) < 2:
+        return None
+    now = now if now is not None else time.time()
+    average = (times[0] - times[-1]) / (len(times) - 1)
+    # Um canal que parou de publicar passa a ser verificado com menos frequência
+    return max(average, now - times[0])
+
+def plan_schedule(upload_interval, max_results, default_interval):
+    """
+    Define a agenda de um canal a partir do seu ritmo de publicação.
+
+    Args:
+        upload_interval (float): Intervalo típico entre uploads (None se desconhecido)
+        max_results (int): Número máximo de vídeos por canal
+        default_interval (int): Intervalo usado quando o ritmo é desconhecido
+
+    Returns:
+        tuple: (segundos até a próxima verificação, vídeos pedidos na verificação)
+    """
+    if upload_interval is None:
+        return default_interval, min(max_results, INCREMENTAL_PAGE_SIZE)
+    poll_interval = min(max(upload_interval * POLL_FRACTION, MIN_POLL_INTERVAL), MAX_POLL_INTERVAL)
+    # Espaço para o dobro dos uploads esperados no intervalo (mais um), para raramente precisar de outra página
+    expected_uploads = poll_interval / max(upload_interval, 1)
+    page_size = min(max(math.ceil(expected_uploads * 2) + 1, 2), max_results)
+    return poll_interval, page_size
+
+def update_schedules(store, channel_ids, max_results, now=None):
+    """Recalcula e grava a agenda dos canais a partir dos vídeos armazenados."""
+    now = now if now is not None else time.time()
+    schedules = []
+    for channel_id in channel_ids:
+        upload_interval = estimate_upload_interval(store.upload_times(channel_id, HISTORY_SIZE), now)
+        poll_interval, page_size = plan_schedule(upload_interval, max_results, store.ttl)
+        schedules.append((channel_id, upload_interval, poll_interval, page_size))
+    store.save_schedule(schedules)
+
+def select_within_budget(store, channel_ids, cost, budget, now=None):
+    """
+    Escolhe os canais vencidos que cabem no que resta do orçamento diário de cota.
+    Todos passam pelo mesmo limite: canais nunca buscados vêm primeiro, depois os marcados
+    para atualização forçada e, por fim, os demais, pelo número esperado de vídeos novos
+    desde a última verificação.
+
+    Returns:
+        tuple: (IDs a verificar agora, IDs adiados)
+    """
+    # Verificações sem custo de cota (feeds RSS) nunca são adiadas
+    if not cost:
+        return list(channel_ids), []
+
+    now = now if now is not None else time.time()
+    candidates = []
+    for channel_id in channel_ids:
+        entry = store.get(channel_id)
+        if entry is None:
+            priority = (2, 0.0)
+        elif not entry['checked_at']:
+            priority = (1, 0.0)
+        else:
+            priority = (0, (now - entry['checked_at']) / (entry['upload_interval'] or store.ttl))
+        candidates.append((priority, channel_id))
+
+    remaining = budget - store.quota_used(quota_day(now))
+    selected = []
+    deferred = []
+    for _, channel_id in sorted(candidates, key=lambda candidate: candidate[0], reverse=True):
+        if remaining >= cost:
+            selected.append(channel_id)
+            remaining -= cost
+        else:
+            deferred.append(channel_id)
+    return selected, deferred
@@ -0,0 +1,796 @@
+"""
+Armazenamento local de vídeos do FlowTube.
+Este módulo guarda vídeos, canais e metadados de busca em um banco SQLite em data/,
+com índice em publishedAt, e responde às consultas do feed (filtro por palavras-chave
+e paginação por chave) sem carregar todos os vídeos na memória. Um índice FTS5 sobre
+títulos e descrições permite a busca textual em todo o histórico, sem usar a API, e o
+histórico de vídeos assistidos fica no mesmo banco, para o feed poder ocultá-los.
+"""
+
+import os
+import re
+import heapq
+import sqlite3
+import threading
+import time
+
+from itertools import islice
+from collections import OrderedDict, namedtuple
+
+from utils.matcher import compile_key, keywords_key, match_key
+from utils.thumbnails import get_thumbnail_url
+from utils.paths import DATA_DIR
+
+# Caminho padrão do banco de dados
+DB_PATH = os.path.join(DATA_DIR, 'flowtube.db')
+
+# Tempo padrão até um canal precisar ser verificado novamente (24 horas)
+DEFAULT_TTL = 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    channel_id TEXT PRIMARY KEY,
+    newest_published TEXT,
+    etag TEXT,
+    depth INTEGER NOT NULL DEFAULT 0,
+    checked_at REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    channel_id TEXT NOT NULL,
+    published_at TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    channel_title TEXT NOT NULL,
+    thumbnail_url TEXT,
+    search_text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_videos_published ON videos (published_at DESC, video_id DESC);
+DROP INDEX IF EXISTS idx_videos_channel;
+CREATE INDEX IF NOT EXISTS idx_videos_channel_published ON videos (channel_id, published_at DESC, video_id DESC);
+CREATE TABLE IF NOT EXISTS video_details (
+    video_id TEXT PRIMARY KEY,
+    duration INTEGER,
+    view_count INTEGER,
+    live_status TEXT,
+    is_short INTEGER NOT NULL DEFAULT 0,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS channel_schedule (
+    channel_id TEXT PRIMARY KEY,
+    upload_interval REAL,
+    poll_interval REAL NOT NULL,
+    page_size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS quota_usage (
+    day TEXT PRIMARY KEY,
+    units INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS channel_backfill (
+    channel_id TEXT PRIMARY KEY,
+    page_token TEXT,
+    videos INTEGER NOT NULL DEFAULT 0,
+    completed_at REAL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS channel_errors (
+    channel_id TEXT PRIMARY KEY,
+    error TEXT NOT NULL,
+    failed_at REAL NOT NULL,
+    failures INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS store_counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS watched (
+    video_id TEXT PRIMARY KEY,
+    watched_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Índice de texto completo sincronizado com a tabela videos por gatilhos
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5 (
+    title, description, content='videos', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS videos_fts_insert AFTER INSERT ON videos BEGIN
+    INSERT INTO videos_fts (rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS videos_fts_delete AFTER DELETE ON videos BEGIN
+    INSERT INTO videos_fts (videos_fts, rowid, title, description) VALUES ('delete', old.rowid, old.title, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS videos_fts_update AFTER UPDATE OF title, description ON videos BEGIN
+    INSERT INTO videos_fts (videos_fts, rowid, title, description) VALUES ('delete', old.rowid, old.title, old.description);
+    INSERT INTO videos_fts (rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+"""
+
+# Peso do título e da descrição na ordenação BM25 da busca
+FTS_WEIGHTS = (10.0, 1.0)
+
+VIDEO_COLUMNS = "video_id, channel_id, published_at, title, description, channel_title, thumbnail_url"
+
+# Até este número de canais o feed é a intercalação (heap) dos fluxos de cada canal;
+# acima dele, o índice global por data (que já é essa intercalação) é percorrido
+MERGE_MAX_CHANNELS = 64
+
+# Vídeos lidos por consulta em cada fluxo de canal (o bloco dobra a cada nova leitura)
+STREAM_CHUNK = 8
+
+# Filtro dos vídeos assistidos (anti-join pela chave primária da tabela watched)
+WATCHED_FILTER = "video_id NOT IN (SELECT video_id FROM watched)"
+
+# Número de registros de vídeo mantidos em memória e compartilhados entre sessões
+RECORD_CACHE_SIZE = 20000
+
+# Número de contagens do feed guardadas (combinações de canais, palavras-chave e filtros)
+COUNT_CACHE_SIZE = 32
+
+class VideoRecord(namedtuple('VideoRecord', VIDEO_COLUMNS)):
+    """Vídeo do feed em formato compacto e imutável: uma tupla com apenas os campos
+    usados pela grade e pelo filtro, compartilhada entre sessões sem ser copiada."""
+    __slots__ = ()
+
+def video_to_row(video):
+    """Converte um item no formato de search().list para uma linha da tabela videos."""
+    snippet = video['snippet']
+    title = snippet.get('title', '')
+    description = snippet.get('description', '')
+    return (
+        video['id']['videoId'],
+        snippet.get('channelId') or '',
+        snippet['publishedAt'],
+        title,
+        description,
+        snippet.get('channelTitle', ''),
+        get_thumbnail_url(video),
+        # Texto já em minúsculas para o filtro por palavras-chave
+        f"{title}\n{description}".lower()
+    )
+
+def video_cursor(video):
+    """Retorna a chave de paginação (publishedAt, videoId) de um vídeo."""
+    return (video.published_at, video.video_id)
+
+def fts_query(text):
+    """Converte o texto digitado em uma consulta FTS5: todos os termos, cada um como prefixo."""
+    terms = re.findall(r"\w+", text.lower())
+    return " ".join(f'"{term}"*' for term in terms)
+
+class VideoStore:
+    """Banco SQLite de vídeos e metadados de busca por canal.
+    Cada thread usa a sua própria conexão; as escritas são serializadas por um lock.
+    Também serve como cache de feed por canal: guarda o maior publishedAt visto, o ETag
+    da última resposta, quantos vídeos foram pedidos e quando o canal foi verificado."""
+
+    def __init__(self, db_path=DB_PATH, ttl=DEFAULT_TTL):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.version = 0
+        self.watched_version = 0
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._records = OrderedDict()
+        self._records_lock = threading.Lock()
+        self._counts = OrderedDict()
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        # Bancos criados antes da contagem de falhas seguidas de cada canal
+        if 'failures' not in {row[1] for row in conn.execute("PRAGMA table_info(channel_errors)")}:
+            conn.execute("ALTER TABLE channel_errors ADD COLUMN failures INTEGER NOT NULL DEFAULT 1")
+        self.fts_enabled = self._create_fts(conn)
+
+    def _create_fts(self, conn):
+        """Cria o índice FTS5, reconstruindo-o a partir dos vídeos já armazenados na primeira vez."""
+        try:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'videos_fts'"
+            ).fetchone()
+            with conn:
+                conn.executescript(FTS_SCHEMA)
+                if not exists:
+                    conn.execute("INSERT INTO videos_fts (videos_fts) VALUES ('rebuild')")
+            return True
+        except sqlite3.OperationalError as e:
+            # SQLite compilado sem FTS5: a busca usa o filtro de palavras-chave
+            print(f"Índice de busca FTS5 indisponível: {e}")
+            return False
+
+    def _conn(self):
+        """Retorna a conexão da thread atual."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Filtro de palavras-chave compilado, em uma passada por vídeo
+            conn.create_function("match_keywords", 2, match_key, deterministic=True)
+            self._local.conn = conn
+        return conn
+
+    def _record(self, row):
+        """Retorna o registro da linha, reaproveitando o objeto já em memória se o vídeo não mudou."""
+        with self._records_lock:
+            record = self._records.get(row[0])
+            if record is not None and record == row:
+                self._records.move_to_end(row[0])
+                return record
+            record = VideoRecord._make(row)
+            self._records[row[0]] = record
+            if len(self._records) > RECORD_CACHE_SIZE:
+                self._records.popitem(last=False)
+            return record
+
+    # Metadados de busca por canal
+
+    def get(self, channel_id):
+        """Retorna os metadados de busca do canal, ou None."""
+        row = self._conn().execute(
+            "SELECT c.newest_published, c.etag, c.depth, c.checked_at, s.upload_interval, s.poll_interval, s.page_size "
+            "FROM channels c LEFT JOIN channel_schedule s ON s.channel_id = c.channel_id WHERE c.channel_id = ?",
+            (channel_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'newest': row[0], 'etag': row[1], 'depth': row[2], 'checked_at': row[3],
+                'upload_interval': row[4], 'poll_interval': row[5], 'page_size': row[6]}
+
+    def needs_full_fetch(self, channel_id, max_results):
+        """Indica se o canal nunca foi buscado ou se foi buscado com menos vídeos do que o pedido."""
+        entry = self.get(channel_id)
+        return entry is None or entry['depth'] < max_results
+
+    def is_fresh(self, channel_id, max_results, now=None):
+        """Indica se o canal pode ser servido do banco sem consultar a API.
+        Usa o intervalo de verificação agendado para o canal ou, sem agenda, o ttl."""
+        entry = self.get(channel_id)
+        if entry is None or entry['depth'] < max_results:
+            return False
+        now = now if now is not None else time.time()
+        return now - entry['checked_at'] < (entry['poll_interval'] or self.ttl)
+
+    def newest_published(self, channel_id):
+        """Retorna o publishedAt do vídeo mais recente do canal, ou None."""
+        entry = self.get(channel_id)
+        return entry['newest'] if entry else None
+
+    def etag(self, channel_id):
+        """Retorna o ETag da última resposta do canal, ou None."""
+        entry = self.get(channel_id)
+        return entry['etag'] if entry else None
+
+    def replace(self, channel_id, videos, max_results, etag=None):
+        """Registra uma busca completa do canal. Os vídeos antigos continuam no histórico."""
+        with self._write_lock, self._conn() as conn:
+            self._upsert_videos(conn, videos)
+            newest = conn.execute(
+                "SELECT MAX(published_at) FROM videos WHERE channel_id = ?", (channel_id,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT OR REPLACE INTO channels (channel_id, newest_published, etag, depth, checked_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (channel_id, newest, etag, max_results, time.time())
+            )
+            self.version += 1
+
+    def merge(self, channel_id, videos, etag=None):
+        """Mescla vídeos novos aos já armazenados do canal.
+
+        Returns:
+            int: Número de vídeos que ainda não estavam no banco
+        """
+        with self._write_lock, self._conn() as conn:
+            new_count = self._upsert_videos(conn, videos)
+            newest = conn.execute(
+                "SELECT MAX(published_at) FROM videos WHERE channel_id = ?", (channel_id,)
+            ).fetchone()[0]
+            conn.execute(
+                "UPDATE channels SET newest_published = ?, etag = COALESCE(?, etag), checked_at = ? "
+                "WHERE channel_id = ?",
+                (newest, etag, time.time(), channel_id)
+            )
+            if new_count:
+                self.version += 1
+            return new_count
+
+    def touch(self, channel_id, etag=None):
+        """Marca o canal como verificado sem alterações (ex.: resposta 304)."""
+        with self._write_lock, self._conn() as conn:
+            conn.execute(
+                "UPDATE channels SET etag = COALESCE(?, etag), checked_at = ? WHERE channel_id = ?",
+                (etag, time.time(), channel_id)
+            )
+
+    def expire(self, channel_ids=None, min_age=0):
+        """Força a verificação dos canais na próxima leitura, mantendo os vídeos armazenados.
+        Canais verificados há menos de min_age segundos são mantidos (ex.: várias abas
+        pedindo Atualizar ao mesmo tempo geram uma única verificação)."""
+        checked_before = time.time() - min_age if min_age else float('inf')
+        with self._write_lock, self._conn() as conn:
+            if channel_ids is None:
+                conn.execute("UPDATE channels SET checked_at = 0 WHERE checked_at < ?", (checked_before,))
+            else:
+                conn.executemany(
+                    "UPDATE channels SET checked_at = 0 WHERE channel_id = ? AND checked_at < ?",
+                    [(channel_id, checked_before) for channel_id in channel_ids]
+                )
+
+    # Agenda de verificação e cota
+
+    def upload_times(self, channel_id, limit=None):
+        """Retorna os publishedAt armazenados do canal, do mais recente para o mais antigo."""
+        sql = "SELECT published_at FROM videos WHERE channel_id = ? ORDER BY published_at DESC"
+        params = [channel_id]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [row[0] for row in self._conn().execute(sql, params)]
+
+    def save_schedule(self, schedules):
+        """Grava a agenda dos canais: lista de (channel_id, upload_interval, poll_interval, page_size)."""
+        if not schedules:
+            return
+        with self._write_lock, self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO channel_schedule (channel_id, upload_interval, poll_interval, page_size) "
+                "VALUES (?, ?, ?, ?)",
+                schedules
+            )
+
+    def quota_used(self, day):
+        """Retorna as unidades de cota gastas no dia (AAAA-MM-DD)."""
+        row = self._conn().execute("SELECT units FROM quota_usage WHERE day = ?", (day,)).fetchone()
+        return row[0] if row else 0
+
+    def add_quota(self, day, units):
+        """Soma unidades de cota gastas no dia."""
+        if not units:
+            return
+        with self._write_lock, self._conn() as conn:
+            conn.execute(
+                "INSERT INTO quota_usage (day, units) VALUES (?, ?) "
+                "ON CONFLICT(day) DO UPDATE SET units = units + excluded.units",
+                (day, units)
+            )
+
+    # Falhas de atualização dos canais (o feed continua com os vídeos armazenados)
+
+    def save_channel_errors(self, errors, succeeded_ids=()):
+        """Grava a falha de cada canal ({channel_id: erro}), contando as falhas seguidas, e apaga
+        a dos canais atualizados com sucesso."""
+        if not errors and not succeeded_ids:
+            return
+        now = time.time()
+        with self._write_lock, self._conn() as conn:
+            conn.executemany(
+                "INSERT INTO channel_errors (channel_id, error, failed_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(channel_id) DO UPDATE SET error = excluded.error, failed_at = excluded.failed_at, "
+                "failures = failures + 1",
+                [(channel_id, str(error), now) for channel_id, error in errors.items()]
+            )
+            conn.executemany(
+                "DELETE FROM channel_errors WHERE channel_id = ?",
+                [(channel_id,) for channel_id in succeeded_ids]
+            )
+
+    def channel_errors(self, channel_ids=None):
+        """Retorna {channel_id: (erro, failed_at, falhas seguidas)} dos canais cuja última atualização falhou."""
+        rows = self._conn().execute("SELECT channel_id, error, failed_at, failures FROM channel_errors").fetchall()
+        wanted = set(channel_ids) if channel_ids is not None else None
+        return {row[0]: (row[1], row[2], row[3]) for row in rows if wanted is None or row[0] in wanted}
+
+    # Backfill do histórico
+
+    def backfill_state(self, channel_id):
+        """Retorna o checkpoint do backfill do canal (próxima página, vídeos lidos, conclusão), ou None."""
+        row = self._conn().execute(
+            "SELECT page_token, videos, completed_at, updated_at FROM channel_backfill WHERE channel_id = ?",
+            (channel_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'page_token': row[0], 'videos': row[1], 'completed_at': row[2], 'updated_at': row[3]}
+
+    def save_backfill_page(self, channel_id, videos, next_page_token):
+        """Grava uma página do histórico do canal e o checkpoint na mesma transação.
+        Sem próxima página, o backfill do canal é marcado como concluído.
+
+        Returns:
+            int: Número de vídeos que ainda não estavam no banco
+        """
+        now = time.time()
+        with self._write_lock, self._conn() as conn:
+            new_count = self._upsert_videos(conn, videos)
+            conn.execute(
+                "INSERT INTO channel_backfill (channel_id, page_token, videos, completed_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(channel_id) DO UPDATE SET page_token = excluded.page_token, "
+                "videos = videos + excluded.videos, completed_at = excluded.completed_at, updated_at = excluded.updated_at",
+                (channel_id, next_page_token, len(videos), None if next_page_token else now, now)
+            )
+            if new_count:
+                self.version += 1
+            return new_count
+
+    def reset_backfill(self, channel_ids=None):
+        """Descarta os checkpoints, para que o próximo backfill comece da página mais recente."""
+        with self._write_lock, self._conn() as conn:
+            if channel_ids is None:
+                conn.execute("DELETE FROM channel_backfill")
+            else:
+                conn.executemany(
+                    "DELETE FROM channel_backfill WHERE channel_id = ?",
+                    [(channel_id,) for channel_id in channel_ids]
+                )
+
+    def _upsert_videos(self, conn, videos):
+        """Insere ou atualiza vídeos e retorna quantos eram novos."""
+        rows = [video_to_row(video) for video in videos]
+        if not rows:
+            return 0
+        # rowcount conta só as linhas inseridas (total_changes incluiria as escritas do índice FTS)
+        new_count = conn.executemany(
+            "INSERT OR IGNORE INTO videos (video_id, channel_id, published_at, title, description, "
+            "channel_title, thumbnail_url, search_text) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows
+        ).rowcount
+        # Atualizar título, descrição e miniatura dos vídeos que já existiam (só se mudaram)
+        updated = conn.executemany(
+            "UPDATE videos SET title = ?, description = ?, channel_title = ?, thumbnail_url = ?, search_text = ? "
+            "WHERE video_id = ? AND (title != ? OR description != ? OR channel_title != ? "
+            "OR thumbnail_url IS NOT ?)",
+            [(row[3], row[4], row[5], row[6], row[7], row[0], row[3], row[4], row[5], row[6]) for row in rows]
+        ).rowcount
+        if updated:
+            # Textos alterados mudam o resultado do filtro por palavras-chave; o contador fica no banco
+            # para que as contagens guardadas por outro processo (ex.: o app, com o refresh.py gravando) expirem
+            conn.execute(
+                "INSERT INTO store_counters (name, value) VALUES ('text_version', 1) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + 1"
+            )
+        return new_count
+
+    # Histórico de vídeos assistidos
+
+    def mark_watched(self, video_ids):
+        """Registra os vídeos como assistidos (com o horário da última vez)."""
+        if not video_ids:
+            return
+        now = time.time()
+        with self._write_lock, self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO watched (video_id, watched_at) VALUES (?, ?)",
+                [(video_id, now) for video_id in video_ids]
+            )
+            self.watched_version += 1
+
+    def unmark_watched(self, video_ids=None):
+        """Remove os vídeos do histórico de assistidos (todos, sem video_ids)."""
+        with self._write_lock, self._conn() as conn:
+            if video_ids is None:
+                conn.execute("DELETE FROM watched")
+            else:
+                conn.executemany("DELETE FROM watched WHERE video_id = ?", [(video_id,) for video_id in video_ids])
+            self.watched_version += 1
+
+    def watched(self, video_ids=None):
+        """Retorna o conjunto dos IDs já assistidos entre os informados (uma consulta pela chave primária),
+        ou de todos os assistidos sem video_ids."""
+        if video_ids is None:
+            return {row[0] for row in self._conn().execute("SELECT video_id FROM watched")}
+        if not video_ids:
+            return set()
+        return {
+            row[0] for row in self._conn().execute(
+                f"SELECT video_id FROM watched WHERE video_id IN ({','.join('?' * len(video_ids))})",
+                list(video_ids)
+            )
+        }
+
+    def count_watched(self):
+        """Conta os vídeos do histórico de assistidos."""
+        return self._conn().execute("SELECT COUNT(*) FROM watched").fetchone()[0]
+
+    # Leitura em blocos para índices em memória (ex.: ordenação por relevância)
+
+    def max_rowid(self):
+        """Retorna o maior rowid da tabela videos (cresce a cada vídeo inserido, também por outro processo)."""
+        return self._conn().execute("SELECT COALESCE(MAX(rowid), 0) FROM videos").fetchone()[0]
+
+    def iter_video_texts(self, after_rowid=0, until_rowid=None, chunk=5000):
+        """Gera blocos de linhas (rowid, video_id, channel_id, published_at, title, search_text)
+        dos vídeos inseridos depois de after_rowid, em ordem de inserção."""
+        conn = self._conn()
+        sql = "SELECT rowid, video_id, channel_id, published_at, title, search_text FROM videos WHERE rowid > ?"
+        params = [after_rowid]
+        if until_rowid is not None:
+            sql += " AND rowid <= ?"
+            params.append(until_rowid)
+        cursor = conn.execute(sql + " ORDER BY rowid", params)
+        while True:
+            rows = cursor.fetchmany(chunk)
+            if not rows:
+                return
+            yield rows
+
+    def matching(self, video_ids, key):
+        """Retorna o conjunto dos IDs cujo texto contém alguma palavra-chave da chave (em lotes de IDs)."""
+        conn = self._conn()
+        found = set()
+        for start in range(0, len(video_ids), 500):
+            batch = video_ids[start:start + 500]
+            found.update(row[0] for row in conn.execute(
+                f"SELECT video_id FROM videos WHERE video_id IN ({','.join('?' * len(batch))}) "
+                "AND match_keywords(search_text, ?) = 1",
+                [*batch, key]
+            ))
+        return found
+
+    def get_videos(self, video_ids):
+        """Retorna os vídeos (VideoRecord) dos IDs, na ordem informada (IDs ausentes são ignorados)."""
+        if not video_ids:
+            return []
+        rows = {
+            row[0]: row for row in self._conn().execute(
+                f"SELECT {VIDEO_COLUMNS} FROM videos WHERE video_id IN ({','.join('?' * len(video_ids))})",
+                list(video_ids)
+            )
+        }
+        return [self._record(rows[video_id]) for video_id in video_ids if video_id in rows]
+
+    # Consultas do feed
+
+    def _feed_where(self, channel_ids, keywords, hide_watched=False):
+        """Monta a cláusula WHERE do feed e os seus parâmetros."""
+        clauses = [f"channel_id IN ({','.join('?' * len(channel_ids))})"]
+        params = list(channel_ids)
+        key = keywords_key(keywords or [])
+        if key:
+            clauses.append("match_keywords(search_text, ?) = 1")
+            params.append(key)
+        if hide_watched:
+            clauses.append(WATCHED_FILTER)
+        return clauses, params
+
+    def videos(self, channel_id, limit=None):
+        """Retorna os vídeos armazenados do canal (mais recentes primeiro)."""
+        sql = f"SELECT {VIDEO_COLUMNS} FROM videos WHERE channel_id = ? ORDER BY published_at DESC, video_id DESC"
+        params = [channel_id]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._record(row) for row in self._conn().execute(sql, params)]
+
+    def count_feed(self, channel_ids, keywords=None, hide_watched=False):
+        """Conta os vídeos do feed dos canais, filtrados pelas palavras-chave (e sem os assistidos, com hide_watched).
+        A contagem do feed inteiro fica guardada e é atualizada só com os vídeos novos (rowid maior que o
+        da última contagem, inclusive gravados por outro processo); os assistidos são descontados com uma
+        consulta que percorre apenas o histórico de assistidos."""
+        if not channel_ids:
+            return 0
+        total = self._count_matching(channel_ids, keywords)
+        if hide_watched:
+            total -= self._count_watched_matching(channel_ids, keywords)
+        return total
+
+    def _cached_count(self, key):
+        with self._records_lock:
+            entry = self._counts.get(key)
+            if entry is not None:
+                self._counts.move_to_end(key)
+            return entry
+
+    def _store_count(self, key, entry):
+        with self._records_lock:
+            self._counts[key] = entry
+            if len(self._counts) > COUNT_CACHE_SIZE:
+                self._counts.popitem(last=False)
+
+    def _count_version(self):
+        """Retorna (maior rowid, versão dos textos) do banco, em uma consulta."""
+        return self._conn().execute(
+            "SELECT (SELECT COALESCE(MAX(rowid), 0) FROM videos), "
+            "(SELECT COALESCE(MAX(value), 0) FROM store_counters WHERE name = 'text_version')"
+        ).fetchone()
+
+    def _count_matching(self, channel_ids, keywords):
+        """Conta os vídeos dos canais com as palavras-chave, somando à contagem guardada só os vídeos novos."""
+        key = ('feed', tuple(channel_ids), keywords_key(keywords or []))
+        max_rowid, text_version = self._count_version()
+        entry = self._cached_count(key)
+        if entry is not None and entry[1] == text_version and entry[0] == max_rowid:
+            return entry[2]
+
+        clauses, params = self._feed_where(channel_ids, keywords)
+        base = 0
+        if entry is not None and entry[1] == text_version and entry[0] < max_rowid:
+            # Os vídeos nunca são apagados: basta contar os inseridos depois da última contagem
+            clauses.append("rowid > ?")
+            params.append(entry[0])
+            base = entry[2]
+        clauses.append("rowid <= ?")
+        params.append(max_rowid)
+        count = base + self._conn().execute(
+            f"SELECT COUNT(*) FROM videos WHERE {' AND '.join(clauses)}", params
+        ).fetchone()[0]
+        self._store_count(key, (max_rowid, text_version, count))
+        return count
+
+    def _count_watched_matching(self, channel_ids, keywords):
+        """Conta os vídeos assistidos que estão no feed (percorre só a tabela watched)."""
+        key = ('watched', tuple(channel_ids), keywords_key(keywords or []))
+        version = (*self._count_version(), self.watched_version)
+        entry = self._cached_count(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        clauses, params = self._feed_where(channel_ids, keywords)
+        # CROSS JOIN fixa a ordem: percorre o histórico e busca cada vídeo pela chave
+        count = self._conn().execute(
+            f"SELECT COUNT(*) FROM watched CROSS JOIN videos USING (video_id) WHERE {' AND '.join(clauses)}", params
+        ).fetchone()[0]
+        self._store_count(key, (version, count))
+        return count
+
+    def feed_page(self, channel_ids, keywords=None, limit=None, after=None, hide_watched=False):
+        """
+        Retorna uma página do feed, do mais recente para o mais antigo.
+
+        Args:
+            channel_ids (list): IDs dos canais do feed
+            keywords (list): Palavras-chave; o vídeo precisa conter ao menos uma no título ou na descrição
+            limit (int): Número máximo de vídeos (None para todos)
+            after (tuple): Chave (publishedAt, videoId) do último vídeo da página anterior
+            hide_watched (bool): Excluir os vídeos assistidos na própria consulta, antes da paginação
+
+        Returns:
+            list: Vídeos (VideoRecord)
+        """
+        if not channel_ids:
+            return []
+        channel_ids = list(dict.fromkeys(channel_ids))
+        if len(channel_ids) <= MERGE_MAX_CHANNELS:
+            return [self._record(row) for row in islice(self._merged_feed(channel_ids, keywords, after, hide_watched), limit)]
+
+        # Muitos canais: percorrer o índice por data, filtrando canal e palavras-chave até completar a página
+        # (sem o índice forçado, o SQLite lê todos os vídeos dos canais e os ordena a cada página)
+        clauses, params = self._feed_where(channel_ids, keywords, hide_watched)
+        if after:
+            clauses.append("(published_at, video_id) < (?, ?)")
+            params.extend(after)
+        sql = (f"SELECT {VIDEO_COLUMNS} FROM videos INDEXED BY idx_videos_published WHERE {' AND '.join(clauses)} "
+               "ORDER BY published_at DESC, video_id DESC")
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._record(row) for row in self._conn().execute(sql, params)]
+
+    def _channel_stream(self, channel_id, after=None, hide_watched=False):
+        """Gera as linhas do canal da mais recente para a mais antiga, lendo em blocos pelo índice do canal."""
+        conn = self._conn()
+        chunk = STREAM_CHUNK
+        while True:
+            sql = f"SELECT {VIDEO_COLUMNS}, search_text FROM videos WHERE channel_id = ?"
+            params = [channel_id]
+            if hide_watched:
+                sql += f" AND {WATCHED_FILTER}"
+            if after:
+                sql += " AND (published_at, video_id) < (?, ?)"
+                params.extend(after)
+            sql += " ORDER BY published_at DESC, video_id DESC LIMIT ?"
+            params.append(chunk)
+            rows = conn.execute(sql, params).fetchall()
+            yield from rows
+            if len(rows) < chunk:
+                return
+            after = (rows[-1][2], rows[-1][0])
+            chunk *= 2
+
+    def _merged_feed(self, channel_ids, keywords=None, after=None, hide_watched=False):
+        """Intercala sob demanda os fluxos já ordenados de cada canal (heap de k fluxos), filtrando
+        pelas palavras-chave; produzir n vídeos custa O(n log k), sem ordenar o feed inteiro."""
+        streams = [self._channel_stream(channel_id, after, hide_watched) for channel_id in channel_ids]
+        merged = heapq.merge(*streams, key=lambda row: (row[2], row[0]), reverse=True)
+        key = keywords_key(keywords or [])
+        matcher = compile_key(key) if key else None
+        for row in merged:
+            if matcher is None or matcher.contains(row[7]):
+                yield row[:7]
+
+    # Detalhes dos vídeos (duração, visualizações, live/short)
+
+    def stale_details(self, video_ids, ttl, now=None):
+        """Retorna os IDs cujos detalhes estão ausentes ou foram buscados há mais de ttl segundos."""
+        if not video_ids:
+            return []
+        now = now if now is not None else time.time()
+        fresh = {
+            row[0] for row in self._conn().execute(
+                f"SELECT video_id FROM video_details WHERE fetched_at > ? "
+                f"AND video_id IN ({','.join('?' * len(video_ids))})",
+                [now - ttl, *video_ids]
+            )
+        }
+        return [video_id for video_id in video_ids if video_id not in fresh]
+
+    def save_details(self, details):
+        """Grava os detalhes dos vídeos com o horário atual."""
+        if not details:
+            return
+        now = time.time()
+        with self._write_lock, self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO video_details (video_id, duration, view_count, live_status, is_short, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(entry['video_id'], entry['duration'], entry['view_count'], entry['live_status'],
+                  int(entry['is_short']), now) for entry in details]
+            )
+
+    def get_details(self, video_ids):
+        """Retorna os detalhes guardados dos vídeos (video_id -> detalhes), mesmo que vencidos."""
+        if not video_ids:
+            return {}
+        rows = self._conn().execute(
+            "SELECT video_id, duration, view_count, live_status, is_short FROM video_details "
+            f"WHERE video_id IN ({','.join('?' * len(video_ids))})",
+            list(video_ids)
+        )
+        return {
+            row[0]: {'video_id': row[0], 'duration': row[1], 'view_count': row[2],
+                     'live_status': row[3], 'is_short': bool(row[4])}
+            for row in rows
+        }
+
+    # Busca textual
+
+    def count_search(self, text):
+        """Conta os vídeos do histórico que correspondem à busca."""
+        query = fts_query(text)
+        if not query:
+            return 0
+        if not self.fts_enabled:
+            return self.count_all(text.split())
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM videos_fts WHERE videos_fts MATCH ?", (query,)
+        ).fetchone()[0]
+
+    def search(self, text, limit=None, offset=0):
+        """
+        Busca nos títulos e descrições de todos os vídeos já armazenados.
+
+        Args:
+            text (str): Texto digitado; cada termo é tratado como prefixo e todos precisam aparecer
+            limit (int): Número máximo de vídeos (None para todos)
+            offset (int): Número de vídeos a pular (paginação)
+
+        Returns:
+            list: Vídeos (VideoRecord), dos mais relevantes (BM25) para os menos
+        """
+        query = fts_query(text)
+        if not query:
+            return []
+        if not self.fts_enabled:
+            return self.all_page(text.split(), limit, offset)
+        columns = ", ".join(f"v.{column.strip()}" for column in VIDEO_COLUMNS.split(","))
+        sql = (f"SELECT {columns} FROM videos_fts JOIN videos v ON v.rowid = videos_fts.rowid "
+               f"WHERE videos_fts MATCH ? ORDER BY bm25(videos_fts, {FTS_WEIGHTS[0]}, {FTS_WEIGHTS[1]}), "
+               "v.published_at DESC LIMIT ? OFFSET ?")
+        params = (query, limit if limit else -1, offset)
+        return [self._record(row) for row in self._conn().execute(sql, params)]
+
+    def count_all(self, keywords):
+        """Conta todos os vídeos armazenados que contêm alguma das palavras-chave."""
+        key = keywords_key(keywords)
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM videos WHERE match_keywords(search_text, ?) = 1", (key,)
+        ).fetchone()[0]
+
+    def all_page(self, keywords, limit=None, offset=0):
+        """Retorna os vídeos armazenados que contêm alguma das palavras-chave, mais recentes primeiro."""
+        key = keywords_key(keywords)
+        sql = (f"SELECT {VIDEO_COLUMNS} FROM videos WHERE match_keywords(search_text, ?) = 1 "
+               "ORDER BY published_at DESC, video_id DESC LIMIT ? OFFSET ?")
+        params = (key, limit if limit else -1, offset)
+        return [self._record(row) for row in self._conn().execute(sql, params)]
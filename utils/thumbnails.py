@@ -0,0 +1,174 @@
+"""
+Cache de miniaturas do FlowTube.
+Este módulo guarda as miniaturas em disco (endereçadas por hash e com remoção LRU
+limitada por tamanho), baixa-as por uma sessão HTTP compartilhada com pool de
+conexões e faz o pré-carregamento em paralelo das páginas do feed.
+"""
+
+import os
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics import metrics
+from utils.paths import DATA_DIR
+
+# Diretório padrão do cache de miniaturas
+THUMBNAILS_DIR = os.path.join(DATA_DIR, 'thumbnails')
+
+# Tamanho máximo padrão do cache em disco (MB)
+DEFAULT_CACHE_MB = 200
+
+# Número de downloads simultâneos
+PREFETCH_WORKERS = 6
+
+# Tempo limite de cada download (segundos)
+REQUEST_TIMEOUT = 10
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Retorna a sessão HTTP compartilhada, com pool de conexões keep-alive."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # Importação adiada: o requests só é carregado no primeiro download
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=PREFETCH_WORKERS * 2)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+class ThumbnailCache:
+    """Cache de miniaturas em disco com remoção LRU limitada por tamanho.
+    Cada arquivo é nomeado pelo hash SHA-256 da URL; as URLs das miniaturas do
+    YouTube são imutáveis para cada vídeo, então o hash identifica o conteúdo.
+    O horário de modificação do arquivo marca o último acesso."""
+
+    def __init__(self, cache_dir=THUMBNAILS_DIR, max_bytes=DEFAULT_CACHE_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._pending = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._entries())
+
+    def path_for(self, url):
+        """Retorna o caminho em disco correspondente à URL."""
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.jpg")
+
+    def get(self, url):
+        """Retorna o caminho da miniatura em cache, ou None se ainda não foi baixada."""
+        path = self.path_for(url)
+        try:
+            # Atualizar o horário de acesso para a ordem LRU
+            os.utime(path)
+            return path
+        except OSError:
+            return None
+
+    def fetch(self, url):
+        """Retorna o caminho da miniatura, baixando-a se necessário.
+        Downloads simultâneos da mesma URL são agrupados em um só."""
+        path = self.get(url)
+        if path:
+            return path
+
+        with self._lock:
+            event = self._pending.get(url)
+            owner = event is None
+            if owner:
+                event = threading.Event()
+                self._pending[url] = event
+
+        if not owner:
+            event.wait(REQUEST_TIMEOUT * 2)
+            return self.get(url)
+
+        start = time.perf_counter()
+        try:
+            response = get_session().get(url, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            metrics.record_thumbnail(time.perf_counter() - start, len(response.content))
+            return self._store(url, response.content)
+        except Exception as e:
+            metrics.record_thumbnail(time.perf_counter() - start, error=e)
+            print(f"Erro ao baixar miniatura {url}: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._pending.pop(url, None)
+            event.set()
+
+    def prefetch(self, urls, executor=None):
+        """Baixa em paralelo as miniaturas que ainda não estão em cache.
+        Sem executor, espera todos os downloads; com executor, agenda-os em segundo plano."""
+        missing = [url for url in dict.fromkeys(urls) if url and not os.path.exists(self.path_for(url))]
+        if not missing:
+            return
+        if executor is not None:
+            for url in missing:
+                executor.submit(self.fetch, url)
+            return
+        with ThreadPoolExecutor(max_workers=min(PREFETCH_WORKERS, len(missing))) as pool:
+            list(pool.map(self.fetch, missing))
+
+    def _store(self, url, content):
+        """Grava o conteúdo de forma atômica e aplica o limite de tamanho."""
+        path = self.path_for(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._total_bytes += len(content)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+        return path
+
+    def _entries(self):
+        """Lista (caminho, tamanho, último acesso) de todos os arquivos em cache."""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.jpg'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self):
+        """Remove os arquivos menos usados até ficar abaixo de 90% do limite."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
+
+def get_thumbnail_url(video, size='high'):
+    """Retorna a URL da miniatura do vídeo no tamanho pedido (ou o maior disponível)."""
+    thumbnails = video['snippet'].get('thumbnails', {})
+    for key in (size, 'medium', 'default'):
+        if key in thumbnails:
+            return thumbnails[key]['url']
+    return None